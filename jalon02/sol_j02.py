@@ -7,7 +7,12 @@ from tools.base import Strategy
 from tools.model import Model, m1, m2
 from tools.evaluations import evaluation, multi_eval, tournament
 from typing import Iterable
+from itertools import accumulate
 from tools.utility import probability_vector
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class Periodic(Strategy):
     """
@@ -21,6 +26,10 @@ class Periodic(Strategy):
         super().__init__(_styl)
     @property
     def word(self) -> str: return self.__word
+    @property
+    def snapshot(self) -> int:
+        """ the position in word """
+        return self.count%len(self.word)
 
     def next_action(self) -> str:
         return self.word[self.count%len(self.word)]
@@ -61,6 +70,18 @@ class Markov(Strategy):
         """ the vector of probas """
         return self.__probas
     
+    def action_distribution(self, rew:str='') -> dict:
+        """ probability of each action after the reward rew
+            '' for the 1st action
+        """
+        if rew == '':
+            if self.style == 'a': return {'C': .5, 'D': .5}
+            return {self.style: 1}
+        p = self.probabilities["TRPS".index(rew)]
+        if p == -1: return {x: 1/len(self.actions) for x in self.actions}
+        if len(self.actions) == 2: return {'C': p, 'D': 1-p}
+        return {'C': p, 'D': (1-p)/2, 'R': (1-p)/2}
+
     def auto_test(self) -> bool:
         """ we need to perform some analysis """
         if self.__diag is None:
@@ -110,7 +131,17 @@ class Stochastic(Strategy):
         self.__diag = all([ (0 <= x <=1 or x == -1) for x in self.__probas])
         # is pre-test enough ?
         self.__done = (len(self.__probas) == 5)
-        
+        # the probabilities never change: one vector per reward
+        self.__table = {}
+        for rew in self._model.reward_names:
+            try:
+                _pr = self.__distribution(rew)
+            except (AssertionError, ValueError):
+                continue # not a distribution, raised again when asked
+            self.__table[rew] = (_pr, list(accumulate(_pr)))
+        # built here, sampling leaves the state of the strategy unchanged
+        self.__sampler = None if np is None else self.__build_sampler()
+
     @property
     def probabilities(self) -> tuple:
         return tuple(self.__probas)
@@ -121,7 +152,11 @@ class Stochastic(Strategy):
         """
         if len(rew) != 1 or rew not in self._model.reward_names:
             return tuple()
+        if rew in self.__table: return self.__table[rew][0]
+        return self.__distribution(rew)
 
+    def __distribution(self, rew:str) -> tuple:
+        """ the vector of probabilities after the reward rew """
         _act = "CD"
         _me = self.my_action(rew)
         _he = self.adv_action(rew)
@@ -130,6 +165,24 @@ class Stochastic(Strategy):
         _pr = [self.__probas[_] for _ in _pos]
         return probability_vector(*_pr)
 
+    def action_distribution(self, rew:str='') -> dict:
+        """ probability of each action after the reward rew
+            '' for the 1st action
+            {} when the probabilities are not a distribution, the
+            caller has to simulate next_action
+        """
+        if rew == '':
+            _1st = self.probabilities[0]
+            if _1st == -1: return {'C': .5, 'D': .5}
+            _1 = {'C': _1st, 'D': 1-_1st}
+        else:
+            try:
+                _1 = dict(zip("CDR", self.get_probabilities(rew)))
+            except (AssertionError, ValueError):
+                return {}
+        if any([not 0 <= x <= 1 for x in _1.values()]): return {}
+        return _1
+
     def auto_test(self) -> bool:
         """ we need to perform some analysis """
         # if we know its wrong say it
@@ -153,8 +206,43 @@ class Stochastic(Strategy):
             if random.random() <= _1st: return 'C'
             return 'D'
         else:
-            _proba = self.get_probabilities(self.memory[-1])
-            return random.choices("CDR", _proba)[0] # r.choices return a list
+            _rew = self.memory[-1]
+            if _rew not in self.__table:
+                _proba = self.get_probabilities(_rew)
+                return random.choices("CDR", _proba)[0]
+            # same draw as choices("CDR", proba), r.choices return a list
+            return random.choices("CDR", cum_weights=self.__table[_rew][1])[0]
+
+    def __build_sampler(self) -> tuple:
+        """ the cumulated distributions as an array and the row of
+            each reward: row 0 is the 1st action, row r+1 is after
+            reward_names[r]
+        """
+        _1st = self.probabilities[0]
+        _1st = .5 if _1st == -1 else _1st
+        _rows = [(_1st, 1, 1)]
+        for rew in self._model.reward_names:
+            _rows.append(self.__table[rew][1] if rew in self.__table
+                         else (np.nan,)*3)
+        _codes = {x:i+1 for i,x in enumerate(self._model.reward_names)}
+        _codes[''] = 0
+        return np.array(_rows), _codes
+
+    def sample_actions(self, last:Iterable,
+                       rng:'np.random.Generator'=None) -> 'np.ndarray':
+        """ one action for each concurrent match, last[i] is the last
+            reward of the match i ('' when nothing has been played)
+            the actions are drawn from rng, a numpy Generator
+        """
+        if np is None: raise RuntimeError("numpy is required")
+        _cumul, _codes = self.__sampler
+        _last = np.array([_codes.get(x, -1) for x in last], dtype=int)
+        if (_last < 0).any() or np.isnan(_cumul[_last]).any():
+            raise ValueError("no distribution for some rewards")
+        _rng = np.random.default_rng() if rng is None else rng
+        _cumul = _cumul[_last]
+        _x = _rng.random(len(_last)) * _cumul[:, -1]
+        return np.array(list("CDR"))[(_cumul <= _x[:, None]).sum(axis=1)]
 
 
 #============== Agent emotionnel =========================#
@@ -14,6 +14,7 @@ from tests.tools import checkTools as chk
 from tools.model import m1, m2, m3, m4
 import random
 import itertools
+import copy
 from tests import test_strategies_jalon01 as j01
 from tests.test_markov import frequency
 
@@ -306,6 +307,34 @@ class TestStochastique(unittest.TestCase):
                 self.o = self.K(_1)
                 self.o.get_reward(r)
                 self.subtest_rule(r)
+
+    def test_action_distribution_invalid(self):
+        """ no distribution: {}, the caller simulates next_action """
+        _att = 'action_distribution'
+        self.o = self.K([1.5, .9, .1, .8, .2, .1, 0, .2, 0], m2)
+        if not hasattr(self.o, _att): self.skipTest(f"no {_att}")
+        self.assertEqual(self.o.action_distribution(''), {})
+        self.assertEqual(self.o.action_distribution('A'), {})
+        _1 = self.o.action_distribution('T')
+        self.assertAlmostEqual(sum(_1.values()), 1)
+
+    def test_sample_actions_state(self):
+        """ sampling does not change the attributes of the strategy
+            they are its identity in the PayoffCache (fingerprint)
+        """
+        _att = 'sample_actions'
+        self.o = self.K([.5, .9, .1, .8, .2, .1, 0, .2, 0], m2)
+        if not hasattr(self.o, _att): self.skipTest(f"no {_att}")
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest("numpy is required")
+        _before = repr(sorted(vars(copy.deepcopy(self.o)).items()))
+        _1 = self.o.sample_actions(['', 'R', 'T', 'S'],
+                                   np.random.default_rng(42))
+        self.assertEqual(len(_1), 4)
+        _after = repr(sorted(vars(copy.deepcopy(self.o)).items()))
+        self.assertEqual(_before, _after, "sampling changed the state")
                 
         
 def suite(fname):
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = """
+
+    The benchmark suite, from the directory jalon03
+    $ python -m benchmarks [-g group ...] [-k word] [-r repeat]
+                           [-o file.json] [-c old.json] [-l]
+
+    -g: the groups to run (evaluation learning tournament eco_evol world)
+        default is every group
+    -k: only the cases whose name contains word
+    -r: number of repetitions, overrides the value of each case
+    -o: the JSON file, default is the standard output
+    -c: a JSON file of a previous run, the ratios new/old are printed
+    -l: list the cases, nothing is timed
+
+    the JSON is {"meta": {...}, "results": [...]}
+    meta: commit, python, numpy, platform, date
+    each result: name, group, params, number, repeat and the time of
+    one call (seconds) min, median, mean, stdev over the repetitions
+
+    run python -O to compare the engines, not the assertions
+"""
+
+#--------------- import -----------------#
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+
+_HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _HERE not in sys.path: sys.path.insert(0, _HERE)
+
+from benchmarks.cases import all_cases, GROUPS
+#========================================#
+
+def measure(case, repeat:int=None) -> dict:
+    """ time case, one setup per repetition """
+    _r = case.repeat if repeat is None else max(1, repeat)
+    _times = []
+    for _ in range(_r):
+        _f = case.setup()
+        _t = time.perf_counter()
+        for _ in range(case.number): _f()
+        _times.append((time.perf_counter() - _t) / case.number)
+    return {'name': case.name, 'group': case.group, 'params': case.params,
+            'number': case.number, 'repeat': _r,
+            'min': min(_times), 'median': statistics.median(_times),
+            'mean': statistics.mean(_times),
+            'stdev': statistics.stdev(_times) if _r > 1 else 0.}
+
+def meta() -> dict:
+    """ where and when the results were obtained """
+    try:
+        _commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                 cwd=_HERE, capture_output=True,
+                                 text=True).stdout.strip() or None
+    except OSError:
+        _commit = None
+    try:
+        import numpy as np
+        _np = np.__version__
+    except ImportError:
+        _np = None
+    return {'commit': _commit, 'python': platform.python_version(),
+            'numpy': _np, 'platform': platform.platform(),
+            'optimize': sys.flags.optimize,
+            'date': time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+def compare(results:list, filename:str):
+    """ print median new/old for the cases known by both runs """
+    with open(filename) as f: _old = json.load(f)
+    _ref = {x['name']: x for x in _old['results']}
+    print("{:60s} {:>10s} {:>10s} {:>7s}".format("case", "old", "new",
+                                                 "ratio"), file=sys.stderr)
+    for x in results:
+        if x['name'] not in _ref: continue
+        _o, _n = _ref[x['name']]['median'], x['median']
+        print("{:60s} {:10.6f} {:10.6f} {:7.2f}"
+              "".format(x['name'], _o, _n, _n/_o if _o > 0 else 0),
+              file=sys.stderr)
+
+def main(argv:list=None):
+    _p = argparse.ArgumentParser(prog="benchmarks",
+                                 description="benchmarks, JSON output")
+    _p.add_argument('-g', '--group', nargs='+', choices=list(GROUPS))
+    _p.add_argument('-k', '--keyword', default='')
+    _p.add_argument('-r', '--repeat', type=int, default=None)
+    _p.add_argument('-o', '--output', default=None)
+    _p.add_argument('-c', '--compare', default=None)
+    _p.add_argument('-l', '--list', action='store_true')
+    _args = _p.parse_args(argv)
+
+    _cases = [x for x in all_cases(_args.group) if _args.keyword in x.name]
+    if _args.list:
+        for x in _cases: print(x.name)
+        return
+    _results = []
+    for x in _cases:
+        _results.append(measure(x, _args.repeat))
+        print("{:60s} {:.6f}".format(x.name, _results[-1]['median']),
+              file=sys.stderr)
+    _1 = {'meta': meta(), 'results': _results}
+    if _args.output is None:
+        json.dump(_1, sys.stdout, indent=1)
+        print()
+    else:
+        with open(_args.output, 'w') as f: json.dump(_1, f, indent=1)
+    if _args.compare is not None: compare(_results, _args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = """
+
+    The cases of the benchmark suite, see __main__.py
+
+    a Case has a name 'group/label', its parameters and a setup
+    setup() is called (not timed) before each repetition, it
+    provides the call to time, so every repetition starts from the
+    same state (seeded, fresh strategies, fresh world)
+
+    groups are
+      evaluation  one pairing per strategy type of sol_j01, sol_j02
+                  and sol_j03, with evaluation, batch_evaluation,
+                  cycle_evaluation and expected_evaluation
+      learning    Mime, Motif, Shannon against some opponents, 50 Mime
+                  with learning or Mime.learn_many
+      tournament  10, 50, 200 strategies
+      eco_evol    many generations, the pairings are in a warm cache
+      world       oneStep (full and frontier), oneRandStep on grids
+                  of several sizes
+
+    sol_j01 and sol_j02 are read from ../jalon01 and ../jalon02, with
+    the tools of this directory ; missing, their cases are not provided
+
+    building the cases does no work: the modules are loaded and the
+    strategies created by the setups, so listing the cases is cheap
+"""
+
+#--------------- import -----------------#
+import os
+import random
+import functools
+import itertools
+import importlib.util
+
+from tools.base import Strategy
+from tools.model import m1, m2
+from tools.evaluations import evaluation, tournament, learning
+from tools.batch_evaluations import batch_evaluation, cycle_evaluation
+from tools.batch_evaluations import expected_evaluation
+from tools.payoff_cache import PayoffCache
+from tools import ecological_evo
+from tools.spatial_evo import World
+import sol_j03
+#========================================#
+
+_HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Case:
+    """ one benchmark: a name, its parameters and the setup """
+    __slots__ = ("name", "params", "setup", "number", "repeat")
+    def __init__(self, name:str, setup, params:dict=None,
+                 number:int=1, repeat:int=5):
+        """ setup() -> f, f() is the timed call
+            number: calls of f per repetition
+            repeat: number of repetitions
+        """
+        self.name = name
+        self.setup = setup
+        self.params = {} if params is None else dict(params)
+        self.number = number
+        self.repeat = repeat
+
+    @property
+    def group(self) -> str:
+        return self.name.split('/')[0]
+
+def _path(jalon:str, name:str) -> str:
+    """ the file of the module name of a previous jalon """
+    return os.path.join(os.path.dirname(_HERE), jalon, name+'.py')
+
+@functools.lru_cache(maxsize=None)
+def _load(jalon:str, name:str):
+    """ the module name of a previous jalon, None if missing
+        loaded once
+    """
+    _file = _path(jalon, name)
+    if not os.path.isfile(_file): return None
+    _spec = importlib.util.spec_from_file_location(name, _file)
+    _1 = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_1)
+    return _1
+
+def strategies() -> dict:
+    """ jalon -> {label: factory}, one label per type of strategy
+        a module is loaded by the first call of one of its factories
+    """
+    _1 = {}
+    if os.path.isfile(_path('jalon01', 'sol_j01')):
+        j01 = lambda: _load('jalon01', 'sol_j01')
+        _1['j01'] = {'Gentle': lambda: j01().Gentle(),
+                     'Fool': lambda: j01().Fool(),
+                     'Tit4Tat': lambda: j01().Tit4Tat(),
+                     'Pavlov': lambda: j01().Pavlov()}
+    if os.path.isfile(_path('jalon02', 'sol_j02')):
+        j02 = lambda: _load('jalon02', 'sol_j02')
+        _1['j02'] = {'Periodic': lambda: j02().Periodic('CCD'),
+                     'Majority': lambda: j02().Majority(1, -1),
+                     'Markov': lambda: j02().Markov(1, [.9, .1, .8, .2]),
+                     'Stochastic': lambda: j02().Stochastic([1, .9, .1,
+                                                             .8, .2]),
+                     'Gradual': lambda: j02().Gradual(True, 2, 1)}
+    _rules = ''.join(random.Random(20).choices('CD', k=20))
+    _1['j03'] = {'Automaton1': lambda: sol_j03.Automaton(1, 'CDDC'),
+                 'Automaton2': lambda: sol_j03.Automaton(-1, _rules)}
+    return _1
+
+def _pool() -> list:
+    """ the factories of every jalon """
+    return [f for v in strategies().values() for f in v.values()]
+
+#========================= groups =========================#
+_EVAL = dict(nbMatch=10, min_iter=1, max_iter=100, epsilon=0)
+
+def evaluation_cases() -> list:
+    """ each pair of types within a jalon, each engine """
+    _1 = []
+    for jalon, sts in strategies().items():
+        for (a,fa),(b,fb) in itertools.combinations_with_replacement(
+                sts.items(), 2):
+            for engine,f in (('evaluation', evaluation),
+                             ('batch', batch_evaluation),
+                             ('cycle', cycle_evaluation),
+                             ('expected', expected_evaluation)):
+                def setup(f=f, fa=fa, fb=fb):
+                    random.seed(42)
+                    _a, _b = fa(), fb()
+                    return lambda: f(_a, _b, model=m2, **_EVAL)
+                _1.append(Case("evaluation/{}/{}/{}-{}"
+                               "".format(engine, jalon, a, b), setup,
+                               dict(_EVAL, engine=engine), number=5))
+    return _1
+
+_LEARN = dict(nbMatch=10, min_iter=50, max_iter=100, epsilon=.05)
+
+def learning_cases() -> list:
+    """ each learner against some opponents """
+    _j = strategies()
+    _opp = {'Tit4Tat': _j['j01']['Tit4Tat']} if 'j01' in _j else {}
+    _opp.update(_j.get('j02', {}))
+    _opp['Automaton2'] = _j['j03']['Automaton2']
+    _learners = {'Mime': lambda d: sol_j03.Mime(d),
+                 'Motif': lambda d: sol_j03.Motif(d, 15),
+                 'Motif-1': lambda d: sol_j03.Motif(d, -1),
+                 'Shannon': lambda d: sol_j03.Shannon(d)}
+    _1 = []
+    for k,fk in _learners.items():
+        for o in ('Tit4Tat', 'Markov', 'Automaton2'):
+            if o not in _opp: continue
+            def setup(fk=fk, fo=_opp[o]):
+                random.seed(42)
+                _k, _o = fk(sol_j03.Automaton(1, 'CDDC')), fo()
+                return lambda: learning(_k, _o, model=m2, **_LEARN)
+            _1.append(Case("learning/{}-{}".format(k, o), setup,
+                           _LEARN))
+    # 50 Mime, the opponents are taken in turn, one learning each
+    # or every learning at once
+    _fs = [_opp[o] for o in ('Tit4Tat', 'Markov', 'Automaton2')
+           if o in _opp]
+    for engine in ('learning', 'learn_many'):
+        def setup(engine=engine):
+            random.seed(42)
+            _ks = [sol_j03.Mime(sol_j03.Automaton(1, 'CDDC'))
+                   for _ in range(50)]
+            _os = [_fs[i % len(_fs)]() for i in range(50)]
+            if engine == 'learn_many':
+                return lambda: sol_j03.Mime.learn_many(_ks, _os, model=m2,
+                                                       **_LEARN)
+            return lambda: [learning(k, o, model=m2, **_LEARN)
+                            for k,o in zip(_ks, _os)]
+        _1.append(Case("learning/{}/Mime-50".format(engine), setup,
+                       dict(_LEARN, size=50), repeat=3))
+    return _1
+
+_TOURNAMENT = dict(nbMatch=2, min_iter=1, max_iter=20, epsilon=0)
+
+def tournament_cases() -> list:
+    """ the strategies are taken in turn from the types """
+    _1 = []
+    _fs = _pool()
+    for n in (10, 50, 200):
+        def setup(n=n):
+            _lst = [_fs[i % len(_fs)]() for i in range(n)]
+            return lambda: tournament(_lst, model=m2, random_state=42,
+                                      **_TOURNAMENT)
+        _1.append(Case("tournament/{}".format(n), setup,
+                       dict(_TOURNAMENT, size=n),
+                       repeat=5 if n < 200 else 2))
+    return _1
+
+def _eco_evol(*args, **kwargs):
+    """ eco_evol without any plot, HASPLOT is restored """
+    _plot = ecological_evo.HASPLOT
+    ecological_evo.HASPLOT = False
+    try:
+        return ecological_evo.eco_evol(*args, **kwargs)
+    finally:
+        ecological_evo.HASPLOT = _plot
+
+def eco_evol_cases() -> list:
+    """ one type per strategy, the cache is warm: generations only """
+    _1 = []
+    _fs = _pool()
+    for n in (1000, 10000, 100000):
+        def setup(n=n):
+            _lst = [f() for f in _fs]
+            _cache = PayoffCache()
+            _eco_evol(1, _lst, model=m2, random_state=42, cache=_cache)
+            return lambda: _eco_evol(n, _lst, model=m2, random_state=42,
+                                     cache=_cache, every=100)
+        _1.append(Case("eco_evol/{}".format(n), setup,
+                       dict(nbIter=n, size=len(_fs), every=100),
+                       repeat=5 if n < 100000 else 2))
+    return _1
+
+_MOORE = [(a,b) for a in (-1,0,1) for b in (-1,0,1) if (a,b) != (0,0)]
+
+def world_cases() -> list:
+    """ a random world, cyclic boundaries, Moore vicinity
+        the payoffs are known before timing
+    """
+    _1 = []
+    _fs = _pool()
+    for n in (20, 50, 100):
+        for step in ('oneStep', 'frontier', 'oneRandStep'):
+            def setup(n=n, step=step):
+                random.seed(42)
+                _lst = [f() for f in _fs]
+                _w = World(_lst, _MOORE, n, n, 15)
+                _w.model = m2
+                _w.random_state = 42
+                for i in range(n):
+                    for j in range(n):
+                        _w.locate_agent(random.choice(_lst), i, j)
+                _w.oneStep() # evaluate the pairings
+                if step == 'oneStep': return lambda: _w.oneStep()
+                if step == 'frontier':
+                    return lambda: _w.oneStep(frontier=True)
+                return lambda: _w.oneRandStep()
+            _1.append(Case("world/{}/{}x{}".format(step, n, n), setup,
+                           dict(nbl=n, nbc=n, vicinity=len(_MOORE)),
+                           number=5))
+    return _1
+
+GROUPS = {'evaluation': evaluation_cases, 'learning': learning_cases,
+          'tournament': tournament_cases, 'eco_evol': eco_evol_cases,
+          'world': world_cases}
+
+def all_cases(groups:list=None) -> list:
+    """ the cases of groups, None means every group """
+    _1 = []
+    for g,f in GROUPS.items():
+        if groups is None or g in groups: _1.extend(f())
+    return _1
@@ -72,6 +72,26 @@ try:
 except:
     print("failed test_shannon")
     pass
+try:
+    from tests import test_model
+except:
+    print("failed test_model")
+    pass
+try:
+    from tests import test_payoff_cache
+except:
+    print("failed test_payoff_cache")
+    pass
+try:
+    from tests import test_warm_start
+except:
+    print("failed test_warm_start")
+    pass
+try:
+    from tests import test_compact_memory
+except:
+    print("failed test_compact_memory")
+    pass
 #========================================#
 
 #================================ unittest area ========================#
@@ -120,8 +140,11 @@ if __name__ == '__main__':
                 '2': ("Periodique Majorite Markov Stochastique Gradual",
                       [test_periodic, test_majority, test_markov,
                        test_stochastic, test_gradual]),
-                '3' : ("Automaton Mime Motif Shannon",
-                       [test_automaton, test_mime, test_motif, test_shannon])
+                '3' : ("Automaton Mime Motif Shannon Model PayoffCache "
+                       "WarmStart CompactMemory",
+                       [test_automaton, test_mime, test_motif, test_shannon,
+                        test_model, test_payoff_cache, test_warm_start,
+                        test_compact_memory])
                        }
     _all = None
     print("select wich subtests you want")
@@ -3,12 +3,20 @@
 
 import random
 from tools.ezCLI import testcode
-from tools.base import Strategy, AbstractLearner
+from tools.base import Strategy, AbstractLearner, RewardMemory
 from tools.model import Model, m1, m2
 from tools.evaluations import evaluation, multi_eval, tournament, learning
+from tools.evaluations import is_learner, rounding
 from typing import Iterable
 from tools.utility import update_storage, backward_search, adv_memory
+from tools.utility import SuffixIndex, ADV_REWARDS
+from tools.verbosity import tracer
 import itertools
+try:
+    import numpy as np
+    from tools.batch_evaluations import compile_strategy
+except ImportError:
+    np = compile_strategy = None
 
 class Automaton(Strategy):
     """
@@ -34,15 +42,85 @@ class Automaton(Strategy):
         self.__rules = rules[:_sz[_mem]]
         # crée une variable booléenne qui vérifie que les actions sont bonnes
         self.__diag = all([x in self.actions for x in self.__rules])
+        self.__compile()
+
+    def __compile(self):
+        """ the rules as a state machine, built once
+            a state is the index of the memory (see encoding), the
+            memories with an unknown reward (such as 'A') come after
+            program[state]: the action, None when chosen at random
+            transitions[state][code]: the state reached after a reward
+            code is the index of the reward in the keys, 4 otherwise
+        """
+        _k = self.memory_limit
+        _words = [_ for i in range(_k+1)
+                  for _ in itertools.product(range(5), repeat=i)]
+        _states = {}
+        for w in _words:
+            if 4 in w: continue
+            _1 = 0
+            for x in w: _1 = _1*4+(x+1)
+            _states[w] = _1
+        for w in _words:
+            if 4 in w: _states[w] = len(_states)
+        _program = [None]*len(_states)
+        _trans = [None]*len(_states)
+        for w,i in _states.items():
+            if i == 0: _program[i] = None if self.style == 'a' else self.style
+            # an unknown reward gives encoding -1 as long as it is in memory
+            else: _program[i] = self.__rules[(-1 if 4 in w else i)-1]
+            _trans[i] = tuple(_states[(w+(x,))[-_k:] if _k > 0 else ()]
+                              for x in range(5))
+        self.__program = tuple(_program)
+        self.__transitions = tuple(_trans)
+        self.__codes = {self.decoding(i+1): i for i in range(4)
+                        if self.encoding(self.decoding(i+1)) > 0}
+        self.__state = 0
+
+    def reward_code(self, rew:str) -> int:
+        """ the code of rew in the transitions """
+        return self.__codes.get(rew, 4)
+
+    @property
+    def state_machine(self) -> tuple:
+        """ program and transitions, see __compile """
+        return self.__program, self.__transitions
+
+    @property
+    def snapshot(self) -> int:
+        """ the current state, None if its action is random """
+        if self.__program[self.__state] is None: return None
+        return self.__state
+
+    def reset(self):
+        super().reset()
+        self.__state = 0
+
+    def get_reward(self, rew:str):
+        super().get_reward(rew)
+        for x in rew:
+            _code = self.__codes.get(x, 4)
+            self.__state = self.__transitions[self.__state][_code]
+
+    def run(self, rewards:Iterable) -> str:
+        """ the actions played from an empty memory, when receiving
+            rewards: the first action, then the answer to each reward
+            the current state is left untouched
+        """
+        _s = 0
+        _acts = [self.__program[0]]
+        for x in rewards:
+            _s = self.__transitions[_s][self.__codes.get(x, 4)]
+            _acts.append(self.__program[_s])
+        return ''.join([random.choice("CD") if x is None else x
+                        for x in _acts])
 
     @property
     def rules(self) -> str: return self.__rules
     def auto_test(self) -> bool: return self.__diag
     def next_action(self) -> str:
-        if self.memory_size == 0:
-            if self.style =='a': return random.choice("CD")
-            return self.style
-        return self.rules[self.encoding(self.memory)-1]
+        _act = self.__program[self.__state]
+        return random.choice("CD") if _act is None else _act
         
 
 class Mime(AbstractLearner):
@@ -55,10 +133,28 @@ class Mime(AbstractLearner):
         self.__rules = [0 for _ in range(85)]
         self.__changed = True
         self.__steps = 0
-    
+        self.__adv = None
+
+    def specific_reset(self):
+        """ the memory is empty """
+        self.__adv = (0, 0)
+
+    def import_state(self, state:bytes):
+        super().import_state(state)
+        self.__adv = None # the index is about the memory of the exporter
+
+    def __adv_index(self) -> int:
+        """ the index of adv_memory(memory), kept by update_knowledge
+            (count, index) is valid as long as count is unchanged
+        """
+        if self.__adv is None or self.__adv[0] != self.count:
+            _mem = self.memory_codes.tobytes().decode('ascii')
+            self.__adv = (self.count, self.encoding(adv_memory(_mem)))
+        return self.__adv[1]
+
     def next_action(self) -> str:
         """ my action by default if no observation made """
-        _i = self.encoding(adv_memory(self.memory))
+        _i = self.__adv_index()
         _act = self.__rules[_i]
         if _act != 0: return _act
         # else
@@ -68,18 +164,22 @@ class Mime(AbstractLearner):
     def update_knowledge(self, rew):
         """ what to do for learning """
         self.__steps += 1
-        if __debug__ and self.__changed:
-            print(f">> avant step {self.__steps:02d}")
-            print(self.rules_system)
-        _i = self.encoding(adv_memory(self.memory))
+        _trace = tracer('learner')
+        if _trace is not None and self.__changed:
+            _trace(f">> avant step {self.__steps:02d}\n{self.rules_system}")
+        _i = self.__adv_index()
         _his = self.adv_action(rew)
         self.__changed = True
         if self.__rules[_i] == _his:# if equal then != 0 then used
             self.good_guess += 1
             self.__changed = False
         self.__rules[_i] = _his
-        if __debug__ and self.__changed:
-            print(f">> après\n{self.rules_system}")
+        # the index after get_reward, -1 means: encode again
+        _n = self.encode_next(_i, rew.translate(ADV_REWARDS),
+                              self.memory_limit) if _i >= 0 else -1
+        self.__adv = None if _n < 0 else (self.count+1, _n)
+        if _trace is not None and self.__changed:
+            _trace(f">> après\n{self.rules_system}")
 
     @property
     def learned_rules(self) -> tuple:
@@ -104,6 +204,183 @@ class Mime(AbstractLearner):
             else: _str += f"{self.decoding(i):<4s} --> {x}\n"
         return _str
 
+    @classmethod
+    def learn_many(cls, learners:Iterable, opponents:Iterable,
+                   nbMatch:int=10, min_iter:int=1, max_iter:int=100,
+                   model:Model=m2, epsilon:float=0) -> list:
+        """ learners[k] learns against opponents[k], the K pairings play
+            their matches at the same time, the rules of the learners
+            are a (K, 85) array, the index of adv_memory is updated
+            from the rewards
+            for each pairing, provides what learning does, the random
+            module is used in the same order within a pairing, so
+            that with K=1 the result is the one of learning
+            the learners end with an empty memory
+            when every default and every opponent is deterministic
+            with a finite memory (see compile_strategy) and no default
+            is its opponent, they are played from their tables, a
+            round is then done without any call of next_action or
+            get_reward, those strategies end with an empty memory
+        """
+        if np is None: raise RuntimeError("numpy is required")
+        _mimes, _opps = list(learners), list(opponents)
+        _K = len(_mimes)
+        if len(_opps) != _K:
+            raise ValueError("expect as many learners as opponents")
+        if any([not isinstance(x, cls) or x.memory_limit != 3
+                for x in _mimes]):
+            raise ValueError("expect {} learners with a memory of 3"
+                             "".format(cls.__name__))
+        _ids = [set([id(x), id(x.default), id(o)])
+                 for x,o in zip(_mimes, _opps)]
+        if sum([len(x) for x in _ids]) != len(set().union(*_ids)):
+            raise ValueError("an instance can't play in two pairings")
+        _epsilon = min(max(epsilon, 0), 1)
+        _acts = model.actions
+        _names = model.reward_names
+        _payoff, _value = model.payoff, model.value
+        _abort = model.values.get('A', 0)
+        _stop = np.array([x == 'R' for x in _acts])
+        # the opponent also keeps the rewards of the default
+        _shared = np.array([x.default is o for x,o in zip(_mimes, _opps)])
+        # rule codes: 0 unknown, 1+position in _rule
+        # '' is the adv_action of a reward unknown by the learner
+        _rule = list(_acts) + ['']
+        # the tables are about the model of each learner
+        # _next: the index of adv_memory after each reward, as
+        # encoding(adv_memory(memory)) in update_knowledge ; -1 (an
+        # unknown reward) is also the last column for Mime
+        # _his: adv_action of each reward as a rule code
+        _tables = {}
+        for x in _mimes:
+            if id(x._model) in _tables: continue
+            _tables[id(x._model)] = (
+                [[x.encoding((x.decoding(i)+r.translate(ADV_REWARDS))[-3:])
+                  for r in _names] for i in range(85)],
+                [1+_rule.index(x.adv_action(r)) for r in _names])
+        _next = np.array([_tables[id(x._model)][0] for x in _mimes])
+        _his = np.array([_tables[id(x._model)][1] for x in _mimes])
+        _rules = np.zeros(shape=(_K, 85), dtype=np.int8)
+        total_st = np.zeros(shape=(_K, 2))
+        total_guess = [[] for _ in range(_K)]
+        total_default = [[] for _ in range(_K)]
+        for x in _mimes: x.reset_learning()
+        for x in _opps:
+            if is_learner(x): x.reset_learning()
+        # noise changes C <-> D, as learning does an unknown rule ('')
+        # is also noisy and becomes D
+        _flip = np.array([_rule.index("CD"[("CD".index(x)+1)%2])
+                          if x in "CD" else c for c,x in enumerate(_rule)])
+        _noisy = np.array([x in "CD" for x in _rule])
+        # the tables of the defaults [0] and the opponents [1]
+        _cs = ([compile_strategy(x.default, model) for x in _mimes] +
+               [compile_strategy(o, model) for o in _opps]
+               if compile_strategy is not None and not _shared.any()
+               else [None])
+        _fast = all([x is not None for x in _cs])
+        if _fast:
+            _sz = max([len(x.actions) for x in _cs])
+            _ca = np.zeros(shape=(2, _K, _sz), dtype=int)
+            _ct = np.zeros(shape=(2, _K, _sz, len(_names)), dtype=int)
+            for n,x in enumerate(_cs):
+                _ca[n // _K, n % _K, :len(x.actions)] = x.actions
+                _ct[n // _K, n % _K, :len(x.actions)] = x.transitions
+        _steps = np.zeros(_K, dtype=int)
+        for i in range(nbMatch):
+            for x in _mimes+_opps: x.reset()
+            _state = np.zeros(shape=(2, _K), dtype=int)
+            _nb = np.array([random.randrange(min_iter, max_iter)
+                            for _ in range(_K)])
+            _adv = np.zeros(_K, dtype=int)
+            _eval = np.zeros(shape=(_K, 2))
+            _played = np.zeros(_K, dtype=int)
+            _guess = np.zeros(_K, dtype=int)
+            _default = np.zeros(_K, dtype=int)
+            _alive = np.ones(_K, dtype=bool)
+            _lost = np.zeros(_K, dtype=int) # an unauthorized round
+            for j in range(int(_nb.max())):
+                _alive &= j < _nb
+                _k = np.flatnonzero(_alive)
+                if len(_k) == 0: break
+                _known = _rules[_k, _adv[_k]]
+                if _fast:
+                    # codes in _rule, the learner may play ''
+                    _a = np.stack([_ca[0, _k, _state[0, _k]],
+                                   _ca[1, _k, _state[1, _k]]], axis=1)
+                    _a[:,0] = np.where(_known != 0, _known-1, _a[:,0])
+                    _default[_k] += _known == 0
+                    # one random() per noisy action, in the order of
+                    # the pairings, the learner first
+                    _m = _noisy[_a]
+                    _u = np.ones(shape=_m.shape)
+                    _u[_m] = [random.random() for _ in range(int(_m.sum()))]
+                    _a = np.where(_m & (_u <= _epsilon), _flip[_a], _a)
+                    _ok = _a[:,0] < len(_acts)
+                    for o in _a[~_ok, 1]:
+                        _act = ['', _acts[o]]
+                        print(f"unauthorized actions {' - '.join(_act)}")
+                    _lost[_k[~_ok]] = 1
+                else:
+                    _a = np.zeros(shape=(len(_k), 2), dtype=int)
+                    _ok = np.ones(len(_k), dtype=bool)
+                    for n,k in enumerate(_k):
+                        if _known[n] != 0: _act = [_rule[_known[n]-1]]
+                        else:
+                            _default[k] += 1
+                            _act = [_mimes[k].default.next_action()]
+                        _act.append(_opps[k].next_action())
+                        for m in range(2):
+                            if _act[m] in "CD" and random.random() <= _epsilon:
+                                _act[m] = "CD"[("CD".index(_act[m])+1)%2]
+                        if ''.join(_act) not in model.rewards:
+                            print(f"unauthorized actions {' - '.join(_act)}")
+                            _ok[n] = False ; _lost[k] = 1
+                        else: _a[n] = [_acts.index(x) for x in _act]
+                _alive[_k[~_ok]] = False
+                _k, _a = _k[_ok], _a[_ok]
+                _r = _payoff[_a[:,0], _a[:,1]]
+                # update_knowledge, adv_action is the rule
+                _h = _his[_k, _r[:,0]]
+                _guess[_k] += _rules[_k, _adv[_k]] == _h
+                _rules[_k, _adv[_k]] = _h
+                _adv[_k] = _next[_k, _adv[_k], _r[:,0]]
+                _eval[_k] += _value[_r]
+                _eval[_k, 1] += _value[_r[:,0]] * _shared[_k]
+                _played[_k] += 1
+                if _fast:
+                    _state[0, _k] = _ct[0, _k, _state[0, _k], _r[:,0]]
+                    _state[1, _k] = _ct[1, _k, _state[1, _k], _r[:,1]]
+                else:
+                    for n,k in enumerate(_k):
+                        _mimes[k].default.get_reward(_names[_r[n,0]])
+                        _opps[k].get_reward(_names[_r[n,1]])
+                # someone gave up
+                _alive[_k] &= ~(_stop[_a[:,0]] | _stop[_a[:,1]])
+            _steps += _played
+            _eval += (_abort * (_nb - _played - _lost))[:, None]
+            total_st += _eval / _nb[:, None]
+            for k in range(_K):
+                total_guess[k].append(int(_guess[k])/int(_played[k])
+                                      if _played[k] != 0 else None)
+                total_default[k].append(int(_default[k]))
+        # the learners get their knowledge
+        for k,x in enumerate(_mimes):
+            x.reset()
+            x.__rules = [0 if c == 0 else _rule[c-1] for c in _rules[k]]
+            x.__steps += int(_steps[k])
+            x.__changed = True
+            x.good_guess = int(_guess[k])
+            x.default_behavior = int(_default[k])
+        _1 = []
+        for k,x in enumerate(_mimes):
+            # if strategies are identical, the total is twice the value
+            if not is_learner(_opps[k]) and x.default == _opps[k]:
+                total_st[k, 1] /= 2
+            mean_st = [float(total_st[k, m]) / nbMatch for m in range(2)]
+            _1.append((tuple(total_default[k]),
+                       rounding(total_guess[k]), rounding(mean_st)))
+        return _1
+
 class Motif(AbstractLearner):
     """ similar pattern have similar consequence """
 
@@ -112,24 +389,42 @@ class Motif(AbstractLearner):
             when we want to learn a NEW behavior
         """
         self.__last = None
-        self.__pattern = ''
+        self.__pattern = ('', 0, 0) # memory, start, end
         
     def reset_learning(self):
         """ this is where specific variables are initialized
             when we want to learn a NEW behavior
+            an infinite memory is indexed as it grows
+            with COMPACT_MEMORY, a finite memory is a RewardMemory
         """
-        self.__working_memory = ''
+        if self.memory_limit < 0: self.__working_memory = SuffixIndex()
+        elif self.COMPACT_MEMORY:
+            self.__working_memory = RewardMemory(self.memory_limit)
+        else: self.__working_memory = ''
+
+    def __search(self) -> tuple:
+        """ backward_search, incremental if memory is infinite """
+        if isinstance(self.__working_memory, SuffixIndex):
+            return self.__working_memory.search()
+        if isinstance(self.__working_memory, RewardMemory):
+            return backward_search(self.__working_memory.view())
+        return backward_search(self.__working_memory)
         
     def next_action(self) -> str:
         """ search in memory backward """
-        _last, _v = backward_search(self.__working_memory)
+        _last, _v = self.__search()
         if _last == []:
-            self.__pattern = ''
+            self.__pattern = ('', 0, 0)
             self.__last = None
             self.default_behavior += 1
             return self.default.next_action()
         else:
-            self.__pattern = self.__working_memory[-_v:]
+            # the pattern is sliced only when displayed
+            _n = len(self.__working_memory)
+            if isinstance(self.__working_memory, RewardMemory):
+                # the ring is overwritten, the pattern is kept
+                self.__pattern = (self.__working_memory[_n-_v:_n], 0, _v)
+            else: self.__pattern = (self.__working_memory, _n-_v, _n)
             _act = [self.adv_action(self.__working_memory[_+1]) for _ in _last]
             _C = _act.count('C') ; _D = _act.count('D')
             if _C > _D:    self.__last = 'C' ; return 'C'
@@ -143,53 +438,60 @@ class Motif(AbstractLearner):
         """ what to do for learning """
         _his = self.adv_action(rew)
         if _his == self.__last: self.good_guess += 1
-        self.__working_memory = update_storage(self.__working_memory,
-                                               rew, self.memory_limit)
+        if isinstance(self.__working_memory, (SuffixIndex, RewardMemory)):
+            self.__working_memory.append(rew)
+        else:
+            self.__working_memory = update_storage(self.__working_memory,
+                                                   rew, self.memory_limit)
             
 
     @property
     def rules_system(self) -> str:
         """ last pattern found """
-        szp, szw = len(self.__pattern), len(self.__working_memory)
-        return (f"last pattern found: '{self.__pattern}'\n"+
+        _wm, _start, _end = self.__pattern
+        szp, szw = _end-_start, len(self.__working_memory)
+        return (f"last pattern found: '{_wm[_start:_end]}'\n"+
                 f"size: {szp} memory {szw}")
 
 class Shannon(AbstractLearner):
     """ Observe behavior after win/loss """
 
+    # reward -> (0:loss or 1:win, his action 0:D or 1:C)
+    __CODES = {'T': (0, 1), 'R': (1, 1), 'S': (1, 0), 'P': (0, 0)}
+
     def specific_reset(self):
         """ this is where specific variables should be initialized 
             after each Match
         """
-        self.__last_index = ''
+        self.__last_index = -1
         
     def reset_learning(self):
         """ this is where specific variables are initialized
             when we want to learn a NEW behavior
         """
-        # the eight memories
+        # the eight memories, the index is a 3 bits key
         # 0:loss or 1:win, 0:change or 1:keep, 0:loss or 1:win
-        self.__shannon_memory = {
-            ''.join(_): None for _ in itertools.product('01', repeat=3) }
+        self.__shannon_memory = [None] * 8
         # victories, behaviors and actions of opponent
-        self.__victories = ''
-        self.__behaviors = ''
-        self.__actions = ''
+        # the last two values, the last one is the lowest bit
+        self.__victories = 0
+        self.__behaviors = 0
+        self.__actions = 0
+        self.__seen = 0 # number of values stored, at most 2
         
     def __follow_rule(self) -> bool:
         """ True if we follow some rule 
             ie : shannon[last_index] is odd
         """
-        return not (self.__shannon_memory.get(self.__last_index, None) is None
-                    or
-                    self.__shannon_memory[self.__last_index]%2 == 0)
-
+        if self.__last_index < 0: return False
+        _v = self.__shannon_memory[self.__last_index]
+        return not (_v is None or _v%2 == 0)
 
-    def __build_key(self) -> str:
-        ''' get the key for shannon memory '''
-        if len(self.__victories) != 2: return ''
+    def __build_key(self) -> int:
+        ''' get the key for shannon memory, -1 if none '''
+        if self.__seen != 2: return -1
         _ = self.__victories
-        return _[0]+self.__behaviors[-1]+_[1]
+        return (_ & 2) << 1 | (self.__behaviors & 1) << 1 | (_ & 1)
     
     def next_action(self) -> str:
         """ my action by default if no observation made """
@@ -200,47 +502,48 @@ class Shannon(AbstractLearner):
             return self.default.next_action()
         # a rule is known, and usable
         if self.__shannon_memory[self.__last_index] == 1: # change repeated
-            _act = "C" if self.__actions[-1] == 'D' else 'D'
+            _act = "CD"[self.__actions & 1]
         else: # keep repeated
-            _act = self.__actions[-1]
+            _act = "DC"[self.__actions & 1]
         return _act
     
     def update_knowledge(self, rew):
         """ what to do for learning """
-        if rew not in 'TRSP': return # no update if reward is not valid
+        # no update if reward is not valid
+        if rew not in self.__CODES: return
+        _win, _his = self.__CODES[rew]
         # decision about victory/defeat
-        self.__victories = update_storage(self.__victories,
-                                          '01'[rew in "SR"])
+        self.__victories = (self.__victories << 1 | _win) & 3
         # store his action
-        self.__actions = update_storage(self.__actions,
-                                        self.adv_action(rew))
-        if len(self.__actions) > 1:
-            _b = '01'[self.__actions[-2] == self.__actions[-1]]
-            self.__behaviors = update_storage(self.__behaviors, _b)
+        self.__actions = (self.__actions << 1 | _his) & 3
+        if self.__seen > 0:
+            _b = 1 ^ (self.__actions ^ self.__actions >> 1) & 1
+            self.__behaviors = (self.__behaviors << 1 | _b) & 3
+        self.__seen = min(self.__seen+1, 2)
         # was we acting according to rules or not
-        if len(self.__last_index) < 3: return # nothing more
+        if self.__last_index < 0: return # nothing more
+        _trace = tracer('learner')
         if self.__follow_rule() and rew in "RP":
-            if __debug__:
-                print('good rule {}'.format(self.__last_index))
+            if _trace is not None:
+                _trace('good rule {}'.format(self.last_index))
             self.good_guess += 1
             return
-        if self.__shannon_memory.get(self.__last_index, None) is None:
-            if __debug__:
-                print('1st time {}'.format(self.__last_index))
-            _value = int(_b+'0', 2)
-        elif self.__shannon_memory[self.__last_index] % 2 == 0:
+        _old = self.__shannon_memory[self.__last_index]
+        if _old is None:
+            _msg = '1st time {}'
+            _value = 2*_b
+        elif _old % 2 == 0:
             # 2nd update
-            if __debug__:
-                print('2nd time {}'.format(self.__last_index), end=' ')
-            if self.__shannon_memory[self.__last_index] == int(_b+'0', 2):
-                if __debug__: print('same behavior, reinforcement')
-                _value = int(_b+'1', 2)
+            if _old == 2*_b:
+                _msg = '2nd time {} same behavior, reinforcement'
+                _value = 2*_b+1
             else:
-                if __debug__: print('new behavior, redo')
-                _value = int(_b+'0', 2)
+                _msg = '2nd time {} new behavior, redo'
+                _value = 2*_b
         else: # rule is wrong
-            if __debug__: print('bad status, remove')
-            _value = int(_b+'0', 2)
+            _msg = 'bad status, remove'
+            _value = 2*_b
+        if _trace is not None: _trace(_msg.format(self.last_index))
         self.__shannon_memory[self.__last_index] = _value
         
     @property
@@ -258,22 +561,23 @@ class Shannon(AbstractLearner):
         _val = ['change, new', 'change, repeated',
                 'keep, new', 'keep, repeated']
         _str = ''
-        for k,v in self.__shannon_memory.items():
+        for k,v in enumerate(self.__shannon_memory):
             _ = ('NA' if v is None
                  else _val[v])
-            _str += f"Rule {translate(k)} status is {_}\n"
+            _str += f"Rule {translate(f'{k:03b}')} status is {_}\n"
         return _str
 
     @property
     def last_index(self) -> str:
         """ the last memory used """
-        return self.__last_index
+        if self.__last_index < 0: return ''
+        return f"{self.__last_index:03b}"
     @property
     def shannon_memories(self) -> tuple:
         """ a view of the eight Shannon's memories """
         _val = ['cn', 'cr', 'gn', 'gr']
         return tuple(['NA' if x is None else _val[x]
-                      for x in self.__shannon_memory.values() ])
+                      for x in self.__shannon_memory ])
     
 #=========================== testcodes ===========================#
 # Vous avez tout à fait la possibilité d'ajouter vos propres tests
@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = "Project 2024: tests of COMPACT_MEMORY (RewardMemory)"
+
+
+import os
+import random
+import unittest
+from unittest.mock import patch
+from tools.model import m1, m2
+from tools.base import Strategy, RewardMemory
+from tools.evaluations import learning
+
+"""
+Convention:
+   a strategy built with COMPACT_MEMORY True is compared with the
+   same strategy built with the string memory, after each reward
+"""
+
+class Keeper(Strategy):
+    """ always the same action, only the memory matters """
+    def next_action(self): return self.style
+
+class TestCompactMemory(unittest.TestCase):
+    """ RewardMemory gives what the string memory gives """
+    def setUp(self):
+        self.addCleanup(setattr, Strategy, 'COMPACT_MEMORY',
+                        Strategy.COMPACT_MEMORY)
+        self.rews = m2.reward_names
+        random.seed(42) # replication purpose
+
+    def twins(self, limit:int) -> tuple:
+        """ the string one, the compact one """
+        Strategy.COMPACT_MEMORY = False
+        _s = Keeper(1, limit, m2)
+        Strategy.COMPACT_MEMORY = True
+        _c = Keeper(1, limit, m2)
+        return _s, _c
+
+    def subtest_same(self, limit:int, nb:int):
+        """ nb rewards, the memories are compared after each """
+        _s, _c = self.twins(limit)
+        if limit != 0: self.assertIsInstance(_c._memory, RewardMemory)
+        for i in range(nb):
+            _r = random.choice(self.rews)
+            _s.get_reward(_r) ; _c.get_reward(_r)
+            self.assertEqual(_s.memory, _c.memory, f"reward {i}")
+            self.assertEqual(_s.memory_size, _c.memory_size)
+            self.assertEqual(_s.memory_limit, _c.memory_limit)
+            self.assertEqual(_s.memory_codes.tobytes(),
+                             _c.memory_codes.tobytes())
+        _s.reset() ; _c.reset()
+        self.assertEqual(_c.memory, '')
+        self.assertEqual(_c.memory_size, 0)
+
+    def test_ring(self):
+        """ limited memory, the ring wraps around several times """
+        for limit in (1, 2, 3, 5, 15):
+            with self.subTest(limit=limit):
+                self.subtest_same(limit, 3*limit+2)
+
+    def test_unlimited(self):
+        """ the buffer grows from 16 codes to 256 """
+        self.subtest_same(-1, 200)
+
+    def test_no_memory(self):
+        """ no memory, nothing is kept """
+        self.subtest_same(0, 5)
+
+    def test_views(self):
+        """ a view taken before the growth is unchanged """
+        _m = RewardMemory(-1)
+        _m.append("TRPS")
+        _v = _m.view()
+        _m.append("RT"*20)
+        self.assertEqual(_v.tobytes(), b"TRPS")
+        self.assertEqual(str(_m), "TRPS"+"RT"*20)
+
+    def test_getitem(self):
+        """ index and slices, ring included """
+        for limit in (3, -1):
+            _m = RewardMemory(limit)
+            _m.append("TRPSPT")
+            _str = str(_m)
+            for key in (0, -1, 1, slice(1, None), slice(-2, None)):
+                with self.subTest(limit=limit, key=key):
+                    self.assertEqual(_m[key], _str[key])
+
+class TestCompactLearners(unittest.TestCase):
+    """ a learner learns the same with COMPACT_MEMORY """
+    def setUp(self):
+        for k in ("Automaton", "Mime", "Motif", "Shannon"):
+            if not hasattr(tp, k): self.skipTest(f"{k} is required")
+        self.addCleanup(setattr, Strategy, 'COMPACT_MEMORY',
+                        Strategy.COMPACT_MEMORY)
+        _d = lambda: tp.Automaton(1, 'CDDC')
+        self.learners = {'Mime': lambda: tp.Mime(_d()),
+                         'Motif': lambda: tp.Motif(_d(), 5),
+                         'Motif-1': lambda: tp.Motif(_d(), -1),
+                         'Shannon': lambda: tp.Shannon(_d())}
+        self.opponent = lambda: tp.Automaton(-1, 'DCCDDCCD')
+
+    @patch('builtins.print')
+    def test_learning(self, mock_prn):
+        """ same seed, same results, same rules """
+        for k,fk in self.learners.items():
+            for model in (m1, m2):
+                with self.subTest(learner=k, model=model.reward_names):
+                    _1 = []
+                    for flag in (False, True):
+                        Strategy.COMPACT_MEMORY = flag
+                        random.seed(7)
+                        _x = fk()
+                        _1.append((learning(_x, self.opponent(), 4, 20,
+                                            60, model, .1),
+                                   _x.rules_system, _x.memory))
+                    self.assertEqual(_1[0], _1[1])
+
+def suite(fname):
+    """ permet de récupérer les tests à passer avec l'import dynamique """
+    global tp
+    klasses = (TestCompactMemory, TestCompactLearners, )
+
+    try:
+        tp = __import__(fname)
+    except Exception as _e:
+        print(_e)
+    sweet = unittest.TestSuite()
+    for klass_t in klasses:
+        sweet.addTest(unittest.makeSuite(klass_t))
+    return sweet
+
+if __name__ == "__main__":
+    param = input("quel est le fichier à traiter ? ")
+    if not os.path.isfile(param): ValueError("need a python file")
+
+    etudiant = param.split('.')[0]
+
+    print("tentative de lecture de {}".format(etudiant))
+    tp = __import__(etudiant) # revient à faire import XXX as tp
+
+    unittest.main()
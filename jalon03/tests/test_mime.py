@@ -9,12 +9,14 @@ __update__ = "12.02.24 17h50"
 
 
 import os
+import copy
 import unittest
 from unittest.mock import patch
 from tests.tools import checkTools as chk
 from tools.model import Model, m1, m2, m3, m4
 from tools.base import Strategy
 from tools.evaluations import adaptive_evaluation as evaluate
+from tools.evaluations import learning
 import random
 
 """
@@ -41,7 +43,22 @@ class Bad(Strategy):
     def __init__(self, m:Model=m1):
         super().__init__(-1, 0, m)
     def next_action(self): return self.style
+class Moody(Strategy):
+    """ C or D at random, gives up sometimes when R is allowed """
+    def __init__(self, m:Model=m1):
+        super().__init__(0, 0, m)
+    def next_action(self):
+        if 'R' in self.actions and random.random() < .02: return 'R'
+        return random.choice("CD")
+
 
+class Tit4Tat(Strategy):
+    """ C first, then the last action of the opponent """
+    def __init__(self, m:Model=m1):
+        super().__init__(1, 1, m)
+    def next_action(self):
+        if self.memory_size == 0: return self.style
+        return self.adv_action(self.memory[-1]) or self.style
 
 class TestDefault(unittest.TestCase):
     """ find the attributes and methods fullfilled """
@@ -403,10 +420,86 @@ class TestMime(unittest.TestCase):
                                 "bad len: found {} expect {}"
                                 "".format(_0.count('\n'), _1))
             
+class TestLearnMany(unittest.TestCase):
+    """ Mime.learn_many, each pairing is learning """
+    def setUp(self):
+        self.kname = "Mime"
+        chk.check_class(tp, self.kname)
+        self.K = getattr(tp, self.kname)
+        if not hasattr(self.K, 'learn_many'):
+            self.skipTest("learn_many is not provided")
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is required")
+        for m in (m1, m2):
+            self.addCleanup(setattr, m, 'table_length', m.table_length)
+        self.opponents = (Gentle, Bad, lambda: Moody(m2))
+
+    def subtest_one(self, seed:int, opp, model:Model, epsilon:float):
+        """ same seed, same results, same rules """
+        random.seed(seed)
+        _x = self.K(Bad())
+        _1 = learning(_x, opp(), 6, 1, 60, model, epsilon)
+        random.seed(seed)
+        _y = self.K(Bad())
+        _2 = self.K.learn_many([_y], [opp()], 6, 1, 60, model, epsilon)
+        self.assertEqual(_1, _2[0])
+        self.assertEqual(_x.learned_rules, _y.learned_rules)
+
+    @patch('builtins.print')
+    def test_single_pairing(self, mock_prn):
+        """ K=1, with or without noise, whatever the tables """
+        for sz in (m2.table_length, 0):
+            for m in (m1, m2): m.table_length = sz
+            for model in (m1, m2):
+                for i,opp in enumerate(self.opponents):
+                    for epsilon in (0, .1):
+                        with self.subTest(table_length=sz, opp=i,
+                                          model=model.reward_names,
+                                          epsilon=epsilon):
+                            for seed in range(3):
+                                self.subtest_one(seed, opp, model,
+                                                 epsilon)
+
+    def subtest_many(self, model:Model, shared:bool):
+        """ K pairings, each one gives what learning gives on a copy
+            no noise and matches of 30 rounds, the results do not
+            depend on the random stream
+        """
+        _opps = [Gentle(), Bad(m2), Tit4Tat(model), Tit4Tat(model),
+                 Gentle(), Bad(m2)]
+        _xs = [self.K(Tit4Tat(model) if k%2 else Bad())
+               for k in range(len(_opps))]
+        if shared: _xs[2] = self.K(_opps[2])
+        _ys, _os = copy.deepcopy((_xs, _opps))
+        random.seed(0)
+        _1 = self.K.learn_many(_xs, _opps, 4, 30, 31, model)
+        for k,(y,o) in enumerate(zip(_ys, _os)):
+            random.seed(k+1)
+            self.assertEqual(_1[k], learning(y, o, 4, 30, 31, model))
+            self.assertEqual(_xs[k].learned_rules, y.learned_rules)
+            self.assertEqual(_xs[k].default_behavior, y.default_behavior)
+
+    @patch('builtins.print')
+    def test_many_pairings(self, mock_prn):
+        """ K>1, deterministic defaults and opponents """
+        for model in (m1, m2):
+            for shared in (False, True):
+                with self.subTest(model=model.reward_names, shared=shared):
+                    self.subtest_many(model, shared)
+
+    def test_shared_instance(self):
+        """ an instance can't play in two pairings """
+        _b = Bad()
+        with self.assertRaises(ValueError):
+            self.K.learn_many([self.K(Gentle()), self.K(Gentle())],
+                              [_b, _b])
+
 def suite(fname):
     """ permet de récupérer les tests à passer avec l'import dynamique """
     global tp
-    klasses = (TestDefault, TestMime, )
+    klasses = (TestDefault, TestMime, TestLearnMany, )
     
     try:
         tp = __import__(fname)
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = "Project 2024: tests of tools/model.py"
+
+
+import unittest
+import itertools
+from tools.model import m1, m2
+
+"""
+Convention:
+   self.models the models to check
+   the lookup tables are rebuilt when table_length changes
+"""
+
+class TestEncodeNext(unittest.TestCase):
+    """ encode_next is the incremental version of encoding """
+    def setUp(self):
+        self.models = (m1, m2)
+        for m in self.models:
+            self.addCleanup(setattr, m, 'table_length', m.table_length)
+
+    def subtest_encode_next(self, m, length:int):
+        """ each memory of size at most length, each reward """
+        for i in range(length+1):
+            for w in itertools.product(m.reward_names, repeat=i):
+                _w = ''.join(w)
+                _idx = m.encoding(_w)
+                for r in m.reward_names:
+                    _1 = m.encode_next(_idx, r, length)
+                    _2 = (-1 if _idx < 0 else
+                          m.encoding((_w+r)[-length:]))
+                    self.assertEqual(_1, _2, f"word '{_w}' reward '{r}'")
+
+    def test_encode_next(self):
+        """ same index as encoding, whatever the size of the tables """
+        for m in self.models:
+            for sz in (0, 1, 4):
+                m.table_length = sz
+                for length in (1, 2, 3):
+                    with self.subTest(model=m.reward_names,
+                                      table_length=sz, length=length):
+                        self.subtest_encode_next(m, length)
+
+def suite(fname):
+    """ permet de récupérer les tests à passer avec l'import dynamique
+        fname is not used, the tools are tested
+    """
+    klasses = (TestEncodeNext, )
+    sweet = unittest.TestSuite()
+    for klass_t in klasses:
+        sweet.addTest(unittest.makeSuite(klass_t))
+    return sweet
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = "Project 2024: tests of tools/payoff_cache.py"
+
+
+import os
+import tempfile
+import unittest
+import sqlite3
+from tools.base import Strategy
+from tools.model import m1, m2
+from tools.evaluations import evaluation, learning
+from tools.payoff_cache import PayoffCache, fingerprint
+
+"""
+Convention:
+   self.o the cache
+   the strategies come from tp, the file under test
+"""
+
+class Unknown(Strategy):
+    """ always D, its class is not registered """
+    def __init__(self):
+        super().__init__(-1, 0, m2)
+    def next_action(self): return self.style
+
+class TestFingerprint(unittest.TestCase):
+    """ equivalent strategies share their fingerprint """
+    def setUp(self):
+        for k in ("Automaton", "Mime"):
+            if not hasattr(tp, k): self.skipTest(f"{k} is required")
+
+    def test_parameters(self):
+        """ the parameters given to the constructor """
+        _1 = fingerprint(tp.Automaton(1, 'CDDC'))
+        self.assertEqual(_1, fingerprint(tp.Automaton(1, 'CDDC')))
+        self.assertNotEqual(_1, fingerprint(tp.Automaton(1, 'CDDD')))
+        self.assertNotEqual(_1, fingerprint(tp.Automaton(-1, 'CDDC')))
+        self.assertNotEqual(_1, fingerprint(tp.Automaton(1, 'CDDC', m2)))
+
+    def test_unknown_class(self):
+        """ not registered: not shared """
+        self.assertNotEqual(fingerprint(Unknown()), fingerprint(Unknown()))
+
+    def test_learned_state(self):
+        """ a warm learner is not a fresh one, its fork is """
+        _x = tp.Mime(tp.Automaton(1, 'CDDC'))
+        _0 = fingerprint(_x)
+        self.assertEqual(_0, fingerprint(tp.Mime(tp.Automaton(1, 'CDDC'))))
+        learning(_x, tp.Automaton(-1, 'DCCD'), 3, 10, 30, m1)
+        self.assertNotEqual(_0, fingerprint(_x))
+        self.assertEqual(fingerprint(_x), fingerprint(_x.fork()))
+
+class TestPayoffCache(unittest.TestCase):
+    """ the keys """
+    def setUp(self):
+        if not hasattr(tp, "Automaton"): self.skipTest("Automaton required")
+        self.sts = tp.Automaton(1, 'CDDC'), tp.Automaton(-1, 'DCCD')
+        _fd, self.filename = tempfile.mkstemp(suffix='.db')
+        os.close(_fd)
+        self.addCleanup(os.remove, self.filename)
+        self.o = PayoffCache(filename=self.filename)
+        self.addCleanup(self.o.close)
+
+    def test_evaluator(self):
+        """ each evaluator has its own entries """
+        _args = (5, 10, 30, m2, .1, 7)
+        self.o.evaluate(*self.sts, *_args)
+        self.o.evaluate(*self.sts, *_args, evaluator=evaluation)
+        self.assertEqual((self.o.hits, self.o.misses), (0, 2))
+        self.assertNotEqual(self.o.key(*self.sts, *_args),
+                            self.o.key(*self.sts, *_args,
+                                       evaluator=evaluation))
+
+    def test_no_seed(self):
+        """ without seed, nothing goes to the file """
+        self.o.evaluate(*self.sts, 5, 10, 30, m2, .1, None)
+        self.o.evaluate(*self.sts, 5, 10, 30, m2, .1, 7)
+        self.o.close()
+        with sqlite3.connect(self.filename) as _db:
+            _1 = _db.execute("SELECT COUNT(*) FROM payoffs").fetchone()
+        self.assertEqual(_1[0], 1)
+
+def suite(fname):
+    """ permet de récupérer les tests à passer avec l'import dynamique """
+    global tp
+    klasses = (TestFingerprint, TestPayoffCache, )
+
+    try:
+        tp = __import__(fname)
+    except Exception as _e:
+        print(_e)
+    sweet = unittest.TestSuite()
+    for klass_t in klasses:
+        sweet.addTest(unittest.makeSuite(klass_t))
+    return sweet
+
+if __name__ == "__main__":
+    param = input("quel est le fichier à traiter ? ")
+    if not os.path.isfile(param): ValueError("need a python file")
+
+    etudiant = param.split('.')[0]
+
+    print("tentative de lecture de {}".format(etudiant))
+    tp = __import__(etudiant) # revient à faire import XXX as tp
+
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = "Project 2024: tests of fork, import_state and learning(keep)"
+
+
+import os
+import random
+import unittest
+from unittest.mock import patch
+from tools.model import m1, m2
+from tools.evaluations import learning
+
+"""
+Convention:
+   self.learners the factories of the learners, from tp
+   a training is split in two parts, the 2nd part goes on from a
+   fork (or an import_state) and must end as the whole training
+"""
+
+class TestWarmStart(unittest.TestCase):
+    """ warm start gives what an uninterrupted training gives """
+    def setUp(self):
+        for k in ("Automaton", "Mime", "Motif", "Shannon"):
+            if not hasattr(tp, k): self.skipTest(f"{k} is required")
+        _d = lambda: tp.Automaton(1, 'CDDC')
+        self.learners = {'Mime': lambda: tp.Mime(_d()),
+                         'Motif': lambda: tp.Motif(_d(), 5),
+                         'Motif-1': lambda: tp.Motif(_d(), -1),
+                         'Shannon': lambda: tp.Shannon(_d())}
+        self.opponent = lambda: tp.Automaton(-1, 'DCCDDCCD')
+        self.args = (10, 30, m2, .1)
+
+    def subtest_split(self, seed:int, fk, warm):
+        """ 6 matches at once, or 3 then 3 more after warm """
+        random.seed(seed)
+        _x = fk()
+        _full = learning(_x, self.opponent(), 6, *self.args)
+        random.seed(seed)
+        _y = fk()
+        learning(_y, self.opponent(), 3, *self.args)
+        _z = warm(_y)
+        _part = learning(_z, self.opponent(), 3, *self.args, keep=True)
+        self.assertEqual(_full[0][3:], _part[0])
+        self.assertEqual(_full[1][3:], _part[1])
+        self.assertEqual(_x.export_state(), _z.export_state())
+
+    @patch('builtins.print')
+    def test_fork(self, mock_prn):
+        """ the 2nd part is played by a fork """
+        for k,fk in self.learners.items():
+            with self.subTest(learner=k):
+                for seed in range(3):
+                    self.subtest_split(seed, fk, lambda y: y.fork())
+
+    @patch('builtins.print')
+    def test_import_state(self, mock_prn):
+        """ the 2nd part is played by a new learner """
+        for k,fk in self.learners.items():
+            def warm(y, fk=fk):
+                _1 = fk()
+                _1.import_state(y.export_state())
+                return _1
+            with self.subTest(learner=k):
+                for seed in range(3):
+                    self.subtest_split(seed, fk, warm)
+
+    @patch('builtins.print')
+    def test_reset(self, mock_prn):
+        """ without keep, the learner starts from scratch """
+        for k,fk in self.learners.items():
+            with self.subTest(learner=k):
+                random.seed(1)
+                _x = fk()
+                _1 = learning(_x, self.opponent(), 3, *self.args)
+                random.seed(1)
+                _y = fk()
+                learning(_y, self.opponent(), 3, *self.args)
+                random.seed(1)
+                _2 = learning(_y.fork(), self.opponent(), 3, *self.args)
+                self.assertEqual(_1, _2)
+
+def suite(fname):
+    """ permet de récupérer les tests à passer avec l'import dynamique """
+    global tp
+    klasses = (TestWarmStart, )
+
+    try:
+        tp = __import__(fname)
+    except Exception as _e:
+        print(_e)
+    sweet = unittest.TestSuite()
+    for klass_t in klasses:
+        sweet.addTest(unittest.makeSuite(klass_t))
+    return sweet
+
+if __name__ == "__main__":
+    param = input("quel est le fichier à traiter ? ")
+    if not os.path.isfile(param): ValueError("need a python file")
+
+    etudiant = param.split('.')[0]
+
+    print("tentative de lecture de {}".format(etudiant))
+    tp = __import__(etudiant) # revient à faire import XXX as tp
+
+    unittest.main()
@@ -3,8 +3,17 @@
 
 __usage__ = """
 base contains: classes with no method predefined 'next_action'
+and RewardMemory, the compact memory used when COMPACT_MEMORY is True
+
+AbstractLearner can export its learned state (export_state, bytes),
+install one (import_state) and fork: a new learner with a copy of
+what has been learned, without building the default strategy again
 """
 
+import copy
+import pickle
+from array import array
+
 try:
     from model import *
 except:
@@ -21,12 +30,76 @@ except:
 
 def main():
     print(__usage__)
+
+class RewardMemory:
+    """ compact memory of rewards: the ascii codes in an array('b')
+        limit > 0: a ring buffer written twice (at i and i+limit), so
+                   the last rewards are always contiguous
+        limit < 0: the array doubles its size when full
+        append is O(1) (amortized if unlimited), view is zero-copy
+    """
+    def __init__(self, limit:int=-1):
+        self.__limit = limit
+        self.__codes = array('b', bytes(2*limit if limit > 0 else 16))
+        self.__start = 0
+        self.__size = 0
+        self.__str = ''
+
+    def append(self, rew:str):
+        """ add the rewards, the oldest are removed if limit is reached """
+        for c in rew.encode('ascii'):
+            if self.__limit > 0:
+                _w = (self.__start + self.__size) % self.__limit
+                self.__codes[_w] = self.__codes[_w + self.__limit] = c
+                if self.__size == self.__limit:
+                    self.__start = (self.__start + 1) % self.__limit
+                else: self.__size += 1
+            else:
+                if self.__size == len(self.__codes): # views stay valid
+                    _old = self.__codes
+                    self.__codes = array('b', bytes(2*len(_old)))
+                    self.__codes[:self.__size] = _old
+                self.__codes[self.__size] = c
+                self.__size += 1
+        self.__str = None
+
+    def view(self) -> memoryview:
+        """ the codes from the oldest to the newest, no copy """
+        return memoryview(self.__codes)[self.__start:
+                                        self.__start + self.__size]
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __getitem__(self, key) -> str:
+        """ rewards by index or slice, only those are decoded """
+        _1 = self.view()[key]
+        if isinstance(_1, int): return chr(_1)
+        return _1.tobytes().decode('ascii')
+
+    def __str__(self) -> str:
+        """ the rewards as a string, built once per append
+            O(size): readers of every round use view or [key]
+        """
+        if self.__str is None:
+            self.__str = self.view().tobytes().decode('ascii')
+        return self.__str
+
+    def __getstate__(self) -> dict:
+        """ the string is not kept: equal memories, equal pickles """
+        _1 = dict(vars(self))
+        _1['_RewardMemory__str'] = None
+        return _1
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(self.__class__.__name__, str(self))
     
 class Strategy:
     """ Main class: 
     idnum: unique identifier
     """
     ID = 1
+    COMPACT_MEMORY = False # True: memory is a RewardMemory
     def __init__(self, styl:int=1, maxsz:int=0, model:Model=m1):
         """
         styl in {-1, 0, 1} defines the default behavior
@@ -46,23 +119,29 @@ class Strategy:
                S (you Cooperate, he Defects)
                A (one Renounces)
         """
-        self.__idnum = self.ID
-        Strategy.ID += 1
+        self._new_identity()
         self.__styl = styl
         self.__size = -1 if maxsz < 0 else maxsz
         self._model = model
+        self.reset()
+
+    def _new_identity(self):
+        """ next idnum, with its color and names """
+        self.__idnum = self.ID
+        Strategy.ID += 1
         self.__color = self.idnum
         self.__name = self.__surname = f"Strat_{self.idnum:03d}"
-        self.reset()
         
     def __getattr__(self, att:str):
         """ provides att from _model """
+        if att == '_model': raise AttributeError(att) # not yet set
         return getattr(self._model, att)
 
     def reset(self):
         """ reset:
         clear memory, history and played encounters """
-        self._memory = ""
+        self._memory = (RewardMemory(self.memory_limit)
+                        if self.COMPACT_MEMORY and self.has_memory else "")
         self._cpt = 0
         self._history = {}
 
@@ -73,7 +152,13 @@ class Strategy:
     @property
     def memory(self) -> str:
         """ memory is a string of rewards received """
-        return self._memory[:]
+        return str(self._memory)
+    @property
+    def memory_codes(self) -> memoryview:
+        """ the ascii codes of memory, no copy if COMPACT_MEMORY """
+        if isinstance(self._memory, RewardMemory):
+            return self._memory.view()
+        return memoryview(self._memory.encode('ascii'))
     @property
     def memory_size(self) -> int:
         """ return the memory used """
@@ -142,7 +227,9 @@ class Strategy:
         _o = self._history.get(rew, 0)
         self._history[rew] = _o+1
         self._cpt += 1
-        if self.memory_limit != 0:
+        if isinstance(self._memory, RewardMemory):
+            self._memory.append(rew)
+        elif self.memory_limit != 0:
             self._memory += rew
             if self.memory_limit > 0 and self.memory_size > self.memory_limit:
                 self._memory = self._memory[1:]
@@ -209,6 +296,44 @@ class AbstractLearner(Strategy):
         Strategy.ID = _ID # reinstall old value
         return _1
     
+    def __learned(self) -> list:
+        """ the attributes set by the subclasses: the learned state """
+        _prefix = tuple("_{}__".format(k.__name__)
+                        for k in self.__class__.__mro__
+                        if issubclass(k, AbstractLearner) and
+                        k is not AbstractLearner)
+        return sorted([k for k in vars(self) if k.startswith(_prefix)])
+
+    def export_state(self) -> bytes:
+        """ what has been learned, see import_state """
+        _klass = "{0.__module__}.{0.__qualname__}".format(self.__class__)
+        return pickle.dumps((_klass, self.memory_limit,
+                             {k: vars(self)[k] for k in self.__learned()}))
+
+    def import_state(self, state:bytes):
+        """ install a state provided by export_state
+            the learner must be of the same class and memory_limit
+        """
+        _klass, _limit, _vars = pickle.loads(state)
+        _mine = "{0.__module__}.{0.__qualname__}".format(self.__class__)
+        if (_klass, _limit) != (_mine, self.memory_limit):
+            raise ValueError("state of {}({}) cant be used by {}({})"
+                             "".format(_klass, _limit, _mine,
+                                       self.memory_limit))
+        vars(self).update(_vars)
+
+    def fork(self) -> 'AbstractLearner':
+        """ a new learner (new idnum) knowing what self has learned
+            the default strategy is copied, not instantiated
+        """
+        _1 = copy.copy(self)
+        _1._new_identity()
+        _1.__default = copy.deepcopy(self.default)
+        vars(_1).update(copy.deepcopy({k: vars(self)[k]
+                                       for k in self.__learned()}))
+        _1.reset()
+        return _1
+
     def reset(self):
         """ reset should be done for learner and default behavior """
         super().reset()
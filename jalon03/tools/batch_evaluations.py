@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = """
+
+    An alternative engine for 'evaluation': the nbMatch matches of a
+    pairing are played in lock-step, as numpy arrays
+
+    * compile_strategy(st, model)
+    probe a strategy and, when it is deterministic with a finite
+    memory (0 <= memory_limit <= 3), provide its table-driven version
+    (CompiledStrategy) ; otherwise provide None
+    a strategy exposing its own state machine (such as Automaton) is
+    not probed
+
+    * batch_evaluation(st1, st2, nbMatch, min_iter, max_iter, model, epsilon)
+    same signature and same result as evaluation
+    if one of the strategies cannot be compiled, evaluation is called
+
+    noise free, the random module is consumed exactly as evaluation does,
+    so that for a given seed the results are identical
+    with noise (epsilon > 0), one Bernoulli mask is drawn per round from
+    a numpy Generator seeded by the random module
+
+    * cycle_evaluation(st1, st2, nbMatch, min_iter, max_iter, model, epsilon)
+    same signature as evaluation, for deterministic strategies without
+    noise: one match is played until the joint state of the strategies
+    repeats, the score of a match of any length is then prefix +
+    k * cycle + remainder, the cost does not depend on max_iter
+    a strategy takes part when it provides a property 'snapshot', a
+    hashable view of its state (None when it is not deterministic), or
+    when it can be compiled, its memory is then its state
+    otherwise, or with noise, evaluation is called
+    the lengths of the matches are drawn as evaluation does, but not the
+    random() calls of the noise, the random state differs afterwards
+
+    * expected_evaluation(st1, st2, nbMatch, min_iter, max_iter, model,
+                          epsilon)
+    same signature as evaluation, for memory-one strategies: the exact
+    expectation of the scores that evaluation estimates, nbMatch is
+    not used and the random module is not used
+    the states of the Markov chain are the joint actions of the last
+    round (4 for m1, 9 for m2, and 1 more once someone gave up), the
+    noise is in the transitions, the expectation over the lengths
+    randrange(min_iter, max_iter) is computed with powers of the matrix
+    a strategy takes part when it provides action_distribution(rew),
+    the probability of each action after the reward rew ('' for the
+    1st action), or when it can be compiled with a memory up to 1
+    otherwise, or when some probabilities are not a distribution,
+    evaluation is called
+"""
+
+#--------------- import -----------------#
+import random
+import itertools
+
+try:
+    from evaluations import *
+except:
+    from tools.evaluations import *
+
+try:
+    import numpy as np
+except:
+    print("numpy is required")
+#========================================#
+
+class CompiledStrategy:
+    """ table-driven view of a deterministic finite memory strategy
+        states are the indexes of the memory words (see Model.encoding)
+        actions[state]: the code of the action played in state
+        transitions[state, rew]: the state reached after the reward rew
+    """
+    __slots__ = ("actions", "transitions")
+    def __init__(self, actions:np.ndarray, transitions:np.ndarray):
+        self.actions = actions
+        self.transitions = transitions
+
+class PayoffTables:
+    """ numeric view of a Model, completed for the engine
+        actions: action codes are the index in model.actions
+        rewards: reward codes are the index in model.reward_names
+        payoff[a1, a2]: the two reward codes (model.payoff)
+        value[r]: the numeric value of the reward code r (model.value)
+    """
+    __slots__ = ("actions", "rewards", "payoff", "value",
+                 "flip", "noisy", "stop", "abort")
+    def __init__(self, model:Model):
+        self.actions = model.actions
+        self.rewards = model.reward_names
+        self.payoff = model.payoff
+        self.value = model.value
+        _values = model.values
+        # noise changes C <-> D, other actions are left untouched
+        _swap = {'C': 'D', 'D': 'C'}
+        self.flip = np.array([self.actions.index(_swap.get(x, x))
+                              for x in self.actions], dtype=np.int8)
+        self.noisy = np.array([x in "CD" for x in self.actions])
+        self.stop = np.array([x == 'R' for x in self.actions])
+        self.abort = _values.get('A', 0)
+
+def _strategy_attributes() -> frozenset:
+    """ the attributes set by Strategy, keep the idnum counter safe """
+    _ID = Strategy.ID
+    _1 = frozenset(vars(Strategy()))
+    Strategy.ID = _ID
+    return _1
+
+def _probe(st:Strategy, word:str) -> str:
+    """ feed st with the rewards of word, return its next action """
+    st.reset()
+    for rew in word: st.get_reward(rew)
+    return st.next_action()
+
+def _from_machine(st:Strategy, model:Model) -> CompiledStrategy:
+    """ st provides its own tables (program, transitions) and
+        reward_code, see Automaton
+    """
+    _tables = PayoffTables(model)
+    _program, _transitions = st.state_machine
+    if any([x is None or x not in _tables.actions for x in _program]):
+        return None # random or unknown action
+    _acts = np.array([_tables.actions.index(x) for x in _program],
+                     dtype=np.int8)
+    _codes = [st.reward_code(x) for x in _tables.rewards]
+    _trans = np.array([[_[c] for c in _codes] for _ in _transitions],
+                      dtype=np.intp)
+    return CompiledStrategy(_acts, _trans)
+
+def compile_strategy(st:Strategy, model:Model=m2) -> CompiledStrategy:
+    """ build the table-driven version of st, None if st is not
+        deterministic with a finite memory
+
+        a strategy with a state_machine property is taken as is
+        st must not be random by style, must have a memory limit
+        in 0..3 and no attribute of its own (an internal state)
+        each memory word is probed twice, 2nd time after some older
+        rewards, both answers have to be the same
+    """
+    if hasattr(st, 'state_machine'): return _from_machine(st, model)
+    if (st.style == 'a' or not 0 <= st.memory_limit <= 3 or
+        not set(vars(st)) <= _strategy_attributes()):
+        return None
+    _tables = PayoffTables(model)
+    # rewards that can be seen before the end of a match
+    _seen = sorted(set(''.join([v for k,v in model.rewards.items()
+                                if 'R' not in k])))
+    _k = st.memory_limit
+    _words = [''.join(_) for i in range(_k+1)
+              for _ in itertools.product(_seen, repeat=i)]
+    _state = random.getstate()
+    _actions = {}
+    try:
+        for w in _words:
+            _act = _probe(st, w)
+            _older = (_seen if len(w) == _k else ['']) if _k > 0 else _seen
+            if (_act not in _tables.actions or
+                any([_probe(st, p+w) != _act for p in _older])):
+                return None
+            _actions[model.encoding(w)] = _tables.actions.index(_act)
+    finally:
+        random.setstate(_state)
+        st.reset()
+    if sorted(_actions) != list(range(len(_words))): return None
+    _n = len(_words)
+    _trans = np.zeros(shape=(_n, len(_tables.rewards)), dtype=np.intp)
+    for i in range(_n):
+        w = model.decoding(i)
+        for j,rew in enumerate(_tables.rewards):
+            if rew not in _seen: continue # the match is over
+            _trans[i,j] = model.encoding((w+rew)[-_k:] if _k > 0 else '')
+    _acts = np.array([_actions[i] for i in range(_n)], dtype=np.int8)
+    return CompiledStrategy(_acts, _trans)
+
+def _calls(sts:tuple, tables:PayoffTables, nb_iter:int) -> list:
+    """ noise free, the matches are identical
+        provides after each round the number of random() calls
+        done by evaluation so far
+    """
+    _s = [0, 0]
+    _cumul = []
+    _n = 0
+    for j in range(nb_iter):
+        _a = [sts[k].actions[_s[k]] for k in range(2)]
+        _n += int(tables.noisy[_a[0]]) + int(tables.noisy[_a[1]])
+        _cumul.append(_n)
+        if tables.stop[_a[0]] or tables.stop[_a[1]]: break
+        _r = tables.payoff[_a[0], _a[1]]
+        _s = [sts[k].transitions[_s[k], _r[k]] for k in range(2)]
+    return _cumul
+
+def _play(sts:tuple, tables:PayoffTables, nb_iter:np.ndarray,
+          epsilon:float=0, rng:np.random.Generator=None) -> np.ndarray:
+    """ play the matches in lock-step, one lane per match
+        return the average score of each match for both strategies
+    """
+    _n = len(nb_iter)
+    _s = [np.zeros(_n, dtype=np.intp) for _ in range(2)]
+    _score = np.zeros(shape=(2, _n))
+    _played = np.zeros(_n, dtype=int)
+    _alive = np.ones(_n, dtype=bool)
+    for j in range(int(nb_iter.max())):
+        _alive &= j < nb_iter
+        if not _alive.any(): break
+        _a = [sts[k].actions[_s[k]] for k in range(2)]
+        if epsilon > 0:
+            _mask = rng.random(size=(2, _n)) <= epsilon
+            for k in range(2):
+                _a[k] = np.where(_mask[k] & tables.noisy[_a[k]],
+                                 tables.flip[_a[k]], _a[k])
+        _r = tables.payoff[_a[0], _a[1]]
+        for k in range(2):
+            _score[k] += np.where(_alive, tables.value[_r[:,k]], 0)
+            _s[k] = np.where(_alive, sts[k].transitions[_s[k], _r[:,k]],
+                             _s[k])
+        _played += _alive
+        _alive &= ~(tables.stop[_a[0]] | tables.stop[_a[1]])
+    # the unplayed rounds are worth 'A'
+    _score += tables.abort * (nb_iter - _played)
+    return _score / nb_iter
+
+def batch_evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
+                     min_iter:int=1, max_iter:int=100, model:Model=m2,
+                     epsilon:float=0) -> tuple:
+    """ same as evaluation, the nbMatch matches are played at once
+        falls back to evaluation when st1 and st2 are the same instance
+        or when one of them cannot be compiled
+    """
+    _sts = (None if st1 == st2 else
+            tuple(compile_strategy(x, model) for x in (st1, st2)))
+    if _sts is None or None in _sts:
+        return evaluation(st1, st2, nbMatch, min_iter, max_iter, model,
+                          epsilon)
+    _epsilon = min(max(epsilon, 0), 1) # 0 <= eps <= 1
+    _tables = PayoffTables(model)
+    _rng = None
+    if _epsilon == 0:
+        # evaluation calls random() for each 'C' or 'D' played
+        # getrandbits(64*n) consumes the same state as n calls
+        _cumul = _calls(_sts, _tables, max_iter)
+        _nb = []
+        for i in range(nbMatch):
+            _nb.append(random.randrange(min_iter, max_iter))
+            _skip = _cumul[min(_nb[-1], len(_cumul))-1]
+            if _skip > 0: random.getrandbits(64*_skip)
+    else:
+        _nb = [random.randrange(min_iter, max_iter) for _ in range(nbMatch)]
+        _rng = np.random.default_rng(random.getrandbits(64))
+    _avg = _play(_sts, _tables, np.array(_nb), _epsilon, _rng)
+    # same order of summation as evaluation
+    total_st = [0, 0]
+    for i in range(nbMatch):
+        for k in range(2): total_st[k] += float(_avg[k,i])
+    mean_st = [ total_st[k] / nbMatch for k in range(2) ]
+    return rounding(mean_st)
+
+def _snapshot(st:Strategy, model:Model):
+    """ a function providing the state of st, None if st has none """
+    if hasattr(st, 'snapshot'): return lambda: st.snapshot
+    if compile_strategy(st, model) is None: return None
+    return lambda: st.memory
+
+def _trajectory(sts:tuple, snaps:tuple, model:Model, length:int) -> tuple:
+    """ play one match of at most length rounds, stop at the first
+        joint state already seen
+        return the rewards of each round for both strategies and
+        the round starting the cycle (None if no cycle found)
+        None if the match can not be played this way
+    """
+    rewards = model.rewards
+    for x in sts: x.reset()
+    _seen = {}
+    _rounds = []
+    for j in range(length):
+        _key = (snaps[0](), snaps[1]())
+        if None in _key: return None # not deterministic
+        if _key in _seen: return _rounds, _seen[_key]
+        _seen[_key] = j
+        _act = [sts[k].next_action() for k in range(2)]
+        gains = rewards.get(''.join(_act), None)
+        if gains is None: return None # unauthorized actions
+        for k in range(2): sts[k].get_reward(gains[k])
+        _rounds.append(gains)
+        if "R" in _act: break # stop the computation
+    return _rounds, None
+
+def _counts(rewards:list, start:int, nb_iter:int) -> dict:
+    """ the occurences of the rewards in the first nb_iter rounds,
+        rewards[start:] being repeated, in the order of appearance
+    """
+    _n = len(rewards)
+    if nb_iter <= _n or start is None:
+        _k, _r = 0, min(nb_iter, _n)
+    else:
+        _k, _r = divmod(nb_iter - start, _n - start)
+        _r += start
+    _1 = {}
+    for x in rewards[:_r]: _1[x] = _1.get(x, 0)+1
+    for x in rewards[start:] if _k > 0 else []:
+        _1[x] = _1.get(x, 0)+_k
+    return _1
+
+def cycle_evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
+                     min_iter:int=1, max_iter:int=100, model:Model=m2,
+                     epsilon:float=0) -> tuple:
+    """ same as evaluation, the matches are scored from their cycle
+        falls back to evaluation with noise, when st1 and st2 are the
+        same instance or when one of them has no state
+    """
+    _snaps = (None if st1 == st2 or epsilon > 0 else
+              tuple(_snapshot(x, model) for x in (st1, st2)))
+    _traj = (None if _snaps is None or None in _snaps else
+             _trajectory((st1, st2), _snaps, model, max(1, max_iter-1)))
+    if _traj is None:
+        return evaluation(st1, st2, nbMatch, min_iter, max_iter, model,
+                          epsilon)
+    _rounds, _start = _traj
+    valeurs = model.values
+    total_st = [0, 0]
+    for i in range(nbMatch):
+        nb_iter = random.randrange(min_iter, max_iter)
+        for k in range(2):
+            _c = _counts([x[k] for x in _rounds], _start, nb_iter)
+            eval_st = sum([valeurs.get(key,0)*v for (key, v) in _c.items()])
+            # the match was given up: the unplayed rounds
+            _played = sum(_c.values())
+            if _played < nb_iter:
+                eval_st += valeurs.get('A',0)*(nb_iter - _played)
+            total_st[k] += eval_st/nb_iter
+    mean_st = [ total_st[k] / nbMatch for k in range(2) ]
+    return rounding(mean_st)
+
+def _memory_one(st:Strategy, model:Model) -> np.ndarray:
+    """ the probabilities of the actions (codes) for the 1st round
+        (row 0) and after each reward code r (row r+1)
+        None if st is not a memory-one strategy
+    """
+    _tables = PayoffTables(model)
+    _n = len(_tables.actions)
+    _1 = np.zeros(shape=(len(_tables.rewards)+1, _n))
+    if hasattr(st, 'action_distribution'):
+        for i,rew in enumerate(('',)+tuple(_tables.rewards)):
+            if rew not in ('', 'T', 'R', 'P', 'S'): continue # match over
+            try:
+                _d = {k:v for k,v in st.action_distribution(rew).items()
+                      if v != 0}
+            except (AssertionError, ValueError):
+                return None
+            if not _d or any([x not in _tables.actions for x in _d]):
+                return None
+            # not a distribution: the simulation does what it can
+            if (any([not 0 < v <= 1 for v in _d.values()]) or
+                abs(sum(_d.values()) - 1) > 1e-6):
+                return None
+            for x,p in _d.items(): _1[i, _tables.actions.index(x)] = p
+        return _1
+    if st.memory_limit > 1: return None
+    _cs = compile_strategy(st, model)
+    if _cs is None: return None
+    _1[0, _cs.actions[0]] = 1
+    for r in range(len(_tables.rewards)):
+        _1[r+1, _cs.actions[_cs.transitions[0, r]]] = 1
+    return _1
+
+def _chain(dists:tuple, tables:PayoffTables, epsilon:float) -> tuple:
+    """ the Markov chain of the joint actions
+        return the initial distribution, the transition matrix and the
+        value of each state for both strategies
+    """
+    _n = len(tables.actions)
+    # noise changes C <-> D with probability epsilon
+    _noise = np.eye(_n)
+    for a in range(_n):
+        if tables.noisy[a]:
+            _noise[a, a] = 1 - epsilon
+            _noise[a, tables.flip[a]] = epsilon
+    _d = [x @ _noise for x in dists]
+    _sz = _n*_n + 1 # the last state: the match has been given up
+    _P = np.zeros(shape=(_sz, _sz))
+    _V = np.zeros(shape=(_sz, 2))
+    _V[-1] = tables.abort
+    _P[-1, -1] = 1
+    for a1 in range(_n):
+        for a2 in range(_n):
+            s = a1*_n+a2
+            _r = tables.payoff[a1, a2]
+            _V[s] = tables.value[_r]
+            if tables.stop[a1] or tables.stop[a2]: _P[s, -1] = 1 ; continue
+            _P[s, :-1] = np.outer(_d[0][_r[0]+1], _d[1][_r[1]+1]).ravel()
+    _pi = np.zeros(_sz)
+    _pi[:-1] = np.outer(_d[0][0], _d[1][0]).ravel()
+    return _pi, _P, _V
+
+def expected_evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
+                        min_iter:int=1, max_iter:int=100, model:Model=m2,
+                        epsilon:float=0) -> tuple:
+    """ same as evaluation, the exact expected scores
+        falls back to evaluation when st1 and st2 are the same instance
+        or when one of them is not a memory-one strategy
+    """
+    _dists = (None if st1 == st2 else
+              tuple(_memory_one(x, model) for x in (st1, st2)))
+    if _dists is None or any([x is None for x in _dists]):
+        return evaluation(st1, st2, nbMatch, min_iter, max_iter, model,
+                          epsilon)
+    _epsilon = min(max(epsilon, 0), 1) # 0 <= eps <= 1
+    _pi, _P, _V = _chain(_dists, PayoffTables(model), _epsilon)
+    # P**0 .. P**(B-1), the rounds are processed B at a time
+    _last = max_iter-1 # the longest match
+    _B = max(1, int(_last**.5))
+    _pows = np.empty(shape=(_B,)+_P.shape)
+    _pows[0] = np.eye(len(_pi))
+    for i in range(1, _B): _pows[i] = _pows[i-1] @ _P
+    _PB = _pows[-1] @ _P
+    _cumul = np.zeros(2) # expected score of the rounds played so far
+    _total = np.zeros(2) # sum over the lengths of the expected average
+    for t in range(0, _last, _B):
+        _m = min(_B, _last-t)
+        # the expected gains of the rounds t+1 .. t+m
+        _gains = (_pi @ _pows[:_m]) @ _V
+        _c = _cumul + np.cumsum(_gains, axis=0)
+        _len = np.arange(t+1, t+_m+1)
+        _ok = _len >= min_iter
+        _total += (_c[_ok] / _len[_ok, None]).sum(axis=0)
+        _cumul = _c[-1]
+        _pi = _pi @ _PB
+    mean_st = _total / (max_iter - min_iter)
+    return rounding([float(x) for x in mean_st])
+
+if __name__ == "__main__":
+    print(__usage__)
+    class Gentle(Strategy):
+        """ always C """
+        def next_action(self): return self.style
+    class Bad(Strategy):
+        """ always D """
+        def __init__(self):
+            super().__init__(-1)
+        def next_action(self): return self.style
+    class Fool(Strategy):
+        """ at random """
+        def __init__(self):
+            super().__init__(0)
+        def next_action(self): return random.choice(self.actions)
+    class Tit4Tat(Strategy):
+        """ starts with C then plays what has played adv """
+        def __init__(self, m:Model=m1):
+            super().__init__(1, 1, m)
+        def next_action(self):
+            if self.memory_size == 0: return self.style
+            return self.adv_action(self.memory)
+    class Pavlov(Strategy):
+        """ when adv switches I switch """
+        def __init__(self, m:Model=m1):
+            super().__init__(1, 1, m)
+        def next_action(self):
+            if self.memory_size == 0: return self.style
+            _default = self.my_action(self.memory)
+            _oppose = "C" if _default == "D" else "D"
+            if self.memory in "PR": return _default
+            return _oppose
+
+    from ezCLI import testcode
+    code = """
+lst = [Gentle(), Bad(), Tit4Tat(), Pavlov()]
+[compile_strategy(x) is not None for x in lst]
+compile_strategy(Fool()) is None
+_1 = []
+for a,b in itertools.product(lst, repeat=2): random.seed(42) ; _1.append(evaluation(a, b, 10, 1, 100, m2))
+_2 = []
+for a,b in itertools.product(lst, repeat=2): random.seed(42) ; _2.append(batch_evaluation(a, b, 10, 1, 100, m2))
+_1 == _2
+random.seed(42)
+batch_evaluation(Tit4Tat(), Bad(), 10, 1, 100, m2, .1)
+batch_evaluation(Fool(), Bad(), 10, 1, 100, m2) # evaluation is used
+random.seed(42)
+cycle_evaluation(Tit4Tat(), Pavlov(), 10, 1, 100, m2)
+cycle_evaluation(Tit4Tat(), Pavlov(), 10, 1, 10**6, m2)
+expected_evaluation(Tit4Tat(), Pavlov(), 10, 1, 100, m2, .1)
+random.seed(42)
+evaluation(Tit4Tat(), Pavlov(), 1000, 1, 100, m2, .1)
+""" ; testcode(code)
@@ -10,8 +10,8 @@ __usage__ = """
     {'C', 'D' 'R'} where 
         C stands for Cooperate, D for Defect, R for Renouncement
 
-    This code contains a lot of print, to get a silent process
-    set DEBUG as False or call python with -O
+    The process is silent, to follow it register a callback for the
+    topic 'ecology' (see verbosity.py)
 
     the noise parameter (epsilon)
     given strategies, it changes the action C <-> D at low rate
@@ -22,12 +22,18 @@ __usage__ = """
 
 
     * eco_evol(nbIter, lstOfStrat, szPop, nbMatch, min_iter, max_iter, model,
-               epsilon, random_state)
+               epsilon, random_state, cache, tolerance, every)
     it is a battle many against many with population evolution
     pop evolves according to their scores against the others
     to accelerate the process, one true battle is done, then we adjust
     the results according to the pop at hand
     if matplotlib is present, draw the pop evolution
+    with cache set (see payoff_cache.PayoffCache), the pairings known
+    from earlier runs are not evaluated again
+    each generation is computed from the matrix S of the scores:
+    fitness = S @ pop * pop, then normalized to the initial pop
+    tolerance stops the loop when pop converges, every bounds the size
+    of the history
 
 """
 
@@ -49,14 +55,14 @@ try:
 except:
     HASPLOT = False
     
-DEBUG = __debug__
 #========================================#
 
 def eco_evol(nbIter:int, lstOfStrat: Iterable,
              szPop:Iterable=[],
              nbMatch:int=5, min_iter:int=10, max_iter:int=100,
              model:Model=m2, epsilon:float=0,
-             random_state:int=None) -> np.array:
+             random_state:int=None, cache:'PayoffCache'=None,
+             tolerance:float=None, every:int=1) -> np.array:
     """
         compute the evolution of population during nbIter generations
         the trick is to compute _scores once and update according to
@@ -64,14 +70,19 @@ def eco_evol(nbIter:int, lstOfStrat: Iterable,
         szPop is the start of pop for each species
         epsilon: amount of noise during battles
         random_state: value for replication ; None=no replication
-        @return the evolution of the pop for each species
+        cache: a PayoffCache shared with other runs ; None=no cache
+        tolerance: stop when no pop changes more than tolerance
+                   between two generations ; None=no early stop
+        every: keep the pop of one generation out of every
+        @return the evolution of the pop for each species, one row
+                for the generations 0, every, 2*every ... and one
+                for the last generation
     """
     if len(lstOfStrat) != len(szPop):
         _szPop = {_.idnum:10 for _ in lstOfStrat}
     else: _szPop = {_.idnum:v for _,v in zip(lstOfStrat, szPop)}
     _initial_pop = sum(_szPop.values())
     _nbM = max(5, nbMatch) # at least 5 matches
-    _h = np.zeros(shape=(nbIter+1, len(_szPop)))
     # 0 initiate the seed
     random.seed(random_state)
     # 1 perform tournament
@@ -79,40 +90,54 @@ def eco_evol(nbIter:int, lstOfStrat: Iterable,
     _who = {x.idnum: set([y.idnum for y in lstOfStrat]) for x in lstOfStrat}
     # 3 perform multi_eval
 
-    for w in lstOfStrat:
-        lst = [x for x in lstOfStrat if x.idnum in _who[w.idnum]]
-        for _ in lstOfStrat: _who[_.idnum].discard(w.idnum)
-        _score = multi_eval(w, lst, _nbM, min_iter, max_iter, model, epsilon)
-        for x,v in _score: #idnum, (v1, v2)
-            _scores[(w.idnum, x)] = v[0]
-            _scores[(x, w.idnum)] = v[1]
-
-    if DEBUG:
-        print("résultat 1 contre 1")
-        print(_scores)
+    if cache is None:
+        for w in lstOfStrat:
+            lst = [x for x in lstOfStrat if x.idnum in _who[w.idnum]]
+            for _ in lstOfStrat: _who[_.idnum].discard(w.idnum)
+            _score = multi_eval(w, lst, _nbM, min_iter, max_iter, model,
+                                epsilon)
+            for x,v in _score: #idnum, (v1, v2)
+                _scores[(w.idnum, x)] = v[0]
+                _scores[(x, w.idnum)] = v[1]
+    else: # known pairings are reused
+        _pairs = [(w, x) for i,w in enumerate(lstOfStrat)
+                  for x in lstOfStrat[i:]]
+        _values = cache.evaluate_many(_pairs, _nbM, min_iter, max_iter,
+                                      model, epsilon, random_state)
+        for (w,x),v in zip(_pairs, _values):
+            _scores[(w.idnum, x.idnum)] = v[0]
+            _scores[(x.idnum, w.idnum)] = v[1]
+
+    _trace = tracer('ecology')
+    if _trace is not None:
+        _trace("résultat 1 contre 1")
+        _trace(str(_scores))
     # _scores are known for each, we can simulate evolution
+    # S[w,x] is the score of w against x, rows are sorted by idnum
+    _ids = sorted(_szPop)
+    _S = np.array([[_scores[(w,x)] for x in _ids] for w in _ids])
+    _pop = np.array([_szPop[_] for _ in _ids], dtype=float)
+    _every = max(1, every)
+    _h = np.zeros(shape=(nbIter//_every+2, len(_ids)))
+    _gens = [] # the generations stored in _h
+    _last = nbIter
     for i in range(nbIter):
-        _h[i,:] = [_[1] for _ in sorted(_szPop.items())] # oldpop
-        _global_pop = np.sum(_h[i,:])
-        if DEBUG: print("pop avant {:2d} {}".format(i, _global_pop))
-        _score_gen = {}
-        _score_iter = {}
-        for _0,w in enumerate(_who):
-            _score_gen[ (w, w) ] = _scores[(w,w)] * _szPop[w]**2
-            for _1,x in enumerate(_who):
-                if _1 <= _0: continue
-                _pop_wx = _szPop[w] * _szPop[x]
-                _score_gen[(w,x)] = _scores[(w,x)] * _pop_wx
-                _score_gen[(x,w)] = _scores[(x,w)] * _pop_wx
-
-            _score_iter[w] = sum([_score_gen[(w,_)] for _ in _who])
-        if DEBUG: print('scores', sorted(_score_iter.items()))
+        if i % _every == 0:
+            _h[len(_gens),:] = _pop # oldpop
+            _gens.append(i)
+        _fitness = _S @ _pop * _pop
+        if _trace is not None:
+            _trace("pop avant {:2d} {}".format(i, np.sum(_pop)))
+            _trace("scores {}".format(list(zip(_ids, _fitness))))
         # update pop
-        _score_total = sum(_score_iter.values())
-        for _ in _szPop:
-            _szPop[_] = _initial_pop * _score_iter[_] / _score_total
+        _old, _pop = _pop, _initial_pop * _fitness / np.sum(_fitness)
+        if tolerance is not None and np.max(np.abs(_pop - _old)) < tolerance:
+            _last = i+1
+            break
 
-    _h[-1,:] = [_[1] for _ in sorted(_szPop.items())] # lastpop
+    _h[len(_gens),:] = _pop # lastpop
+    _gens.append(_last)
+    _h = _h[:len(_gens)]
 
     # and now the graph of evolution
     if HASPLOT:
@@ -120,7 +145,8 @@ def eco_evol(nbIter:int, lstOfStrat: Iterable,
         _str = "{} [{}]"
         ax = fig.add_subplot(1,1,1)
         for j,l in enumerate(lstOfStrat):
-            ax.plot(_h[:,j], label=_str.format(l.__class__.__name__, l.idnum))
+            ax.plot(_gens, _h[:,j],
+                    label=_str.format(l.__class__.__name__, l.idnum))
         ax.set_xlabel('générations')
         ax.set_ylabel('population')
         ax.set_title('Evolution of population with noise {}'.format(epsilon))
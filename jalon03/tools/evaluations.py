@@ -10,8 +10,8 @@ __usage__ = """
     {'C', 'D' 'R'} where 
         C stands for Cooperate, D for Defect, R for Renouncement
 
-    This code contains a lot of print, to get a silent process
-    set DEBUG as False or call python with -O
+    The evaluations are silent, to follow them register a callback
+    (see verbosity.py), eg. with tracing(printer): evaluation(st1, st2)
 
     the noise parameter (epsilon)
     given strategies, it changes the action C <-> D at low rate
@@ -29,11 +29,18 @@ __usage__ = """
     it corresponds to a battle (evaluation) one against many
 
     * tournament(lstOfStrat, nbMatch, min_iter, max_iter, model, 
-                 epsilon, random_state)
+                 epsilon, random_state, workers)
     it is a battle many against many, no evolution, it's a snapshot
+    with workers set, the pairings are farmed to a pool of processes
+    and each pairing has its own seed (see pair_seed), the scores
+    do not depend on the number of workers
+    with cache set (see payoff_cache.PayoffCache), the known pairings
+    are not evaluated again
 
     * learning is identical to evaluation, except that the 1st
       strategy is required to be a learner
+      what has been learned is forgotten first, unless keep is True
+      (a learner warm-started by fork or import_state)
 
     * adaptive_evaluation:
         if any strategy is a learner -> learning
@@ -44,6 +51,7 @@ __usage__ = """
 #--------------- import -----------------#
 import random
 from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from model import Model, m1, m2
@@ -60,8 +68,10 @@ except:
     except:
         print("No class 'Strategy' found")
         Strategy = 'Strategy'
-    
-DEBUG = __debug__
+try:
+    from verbosity import *
+except:
+    from tools.verbosity import *
 #========================================#
 def rounding(values:Iterable, p:int=3):
     ''' rounding 1e-p '''
@@ -69,6 +79,19 @@ def rounding(values:Iterable, p:int=3):
         return tuple([rounding(x,p) for x in values])
     return tuple([round(x,p) for x in values])
 
+def _observed(st:Strategy):
+    """ st.next_action, reporting the state of st after each call
+        when st has a state and 'round' is traced
+    """
+    _trace = tracer('round')
+    if _trace is None or not hasattr(st, 'state'): return st.next_action
+    def _next_action() -> str:
+        _act = st.next_action()
+        _trace(f"Tour {st.count+1}, state = {st.state}"
+               f" prediction = {st.make_prediction()}")
+        return _act
+    return _next_action
+
 def evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10, 
                min_iter:int=1, max_iter:int=100, model:Model=m2,
                epsilon:float=0) -> tuple:
@@ -85,6 +108,8 @@ def evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
     rewards = model.rewards
     valeurs = model.values
     _sts = st1, st2
+    _trace = tracer('evaluation')
+    _next = [_observed(x) for x in _sts]
     total_st = [0, 0]
     total_iter = 0
     total_noise = [0, 0]
@@ -95,11 +120,8 @@ def evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
 
         total_iter += nb_iter
         for j in range(nb_iter):
-            _act = [_sts[k].next_action() for k in range(2)]
+            _act = [_next[0](), _next[1]()]
             for k in range(2):
-                if DEBUG and hasattr(_sts[k], 'state'):
-                    print(f"Tour {j+1}, state = {_sts[k].state}"
-                          f" prediction = {_sts[k].make_prediction()}")
                 # noisy communication
                 if _act[k] in "CD" and random.random() <= _epsilon:
                     total_noise[k] += 1
@@ -109,8 +131,8 @@ def evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
                 print(f"unauthorized actions {' - '.join(_act)}") ; break
             for k in range(2): _sts[k].get_reward(gains[k])
             if "R" in _act: break # stop the computation
-        if DEBUG and total_noise != [0,0]:
-            print("Match {}, noises {}".format(i+1, total_noise))
+        if _trace is not None and total_noise != [0,0]:
+            _trace("Match {}, noises {}".format(i+1, total_noise))
         # do the numeric part of the played games
         for k in range(2):
             eval_st[k] += sum([valeurs.get(key,0)*v
@@ -126,11 +148,11 @@ def evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
     # if strategies are identical, the total is twice the value
     if st1 == st2:
         total_st[0] = total_st[1] = total_st[0]/2
-    if DEBUG:
+    if _trace is not None:
         if total_noise == [0,0]:
-            print(f"{nbMatch=} noise free")
+            _trace(f"{nbMatch=} noise free")
         else:
-            print("Match {}, noises {}".format(nbMatch, total_noise))
+            _trace("Match {}, noises {}".format(nbMatch, total_noise))
     # mean score
     mean_st = [ total_st[k] / nbMatch for k in range(2) ]
     return rounding(mean_st)
@@ -153,39 +175,87 @@ def multi_eval(st1:Strategy, lstOfStrat:Iterable,
     return sorted(list(_scores.items()), key=lambda x:x[0])
 
 
+def pair_seed(random_state:int, id1:int, id2:int) -> str:
+    """ the seed of the pairing id1, id2 given random_state
+        it does not depend on the order of the pairings nor of id1, id2
+        None means: no replication
+    """
+    if random_state is None: return None
+    return "{}:{}:{}".format(random_state, min(id1, id2), max(id1, id2))
+
+def _pair_evaluation(st1:Strategy, st2:Strategy, seed:str,
+                     params:tuple) -> tuple:
+    """ one pairing, with its own seed -- used by the workers """
+    random.seed(seed)
+    return adaptive_evaluation(st1, st2, *params)
+
 def tournament(lstOfStrat:Iterable,
                nbMatch:int=10, min_iter:int=1, max_iter:int=100,
                model:Model=m2, epsilon:float=0,
-               random_state:int=None) -> list:
+               random_state:int=None, workers:int=None,
+               cache:'PayoffCache'=None) -> list:
     """
        compute the scores among n species
        epsilon is the amount of noise during battle
        random_state specified you can reproduce the results
             None means: no replication
+       workers None: one process, the seed is set once
+               n > 0: n processes, each pairing has its own seed
+       cache None: every pairing is evaluated
+             otherwise a PayoffCache, seeds depend on the fingerprints
     """
-    #1 initiate the seed
-    random.seed(random_state)
-    # 2 initiate local vars
+    # 1 initiate local vars
     _scores = {}
-    _who = {x.idnum: set([y.idnum for y in lstOfStrat]) for x in lstOfStrat}
-    # 3 perform multi_eval
-
-    if DEBUG: _match = {x.idnum:0 for x in lstOfStrat}
-
-    for w in lstOfStrat:
-        lst = [x for x in lstOfStrat if x.idnum in _who[w.idnum]]
-        for _ in lstOfStrat: _who[_.idnum].discard(w.idnum)
-        _score = multi_eval(w, lst, nbMatch, min_iter, max_iter, model, epsilon)
-        if DEBUG: print(">> résultat ", _score)
-        for x,v in _score: #idnum, (v1, v2)
-            _scores[w.idnum] = _scores.get(w.idnum, 0)+v[0]
-            if x != w.idnum: # do not count twice
-                _scores[x] = _scores.get(x, 0)+v[1]
-            if DEBUG:
-                _match[w.idnum] += 1 
-                if x != w.idnum: _match[x] +=1
-
-    if DEBUG:  print(">> rencontres ", _match)
+    _results = [] # (idnum, idnum, (v1, v2))
+    _params = (nbMatch, min_iter, max_iter, model, epsilon)
+    _trace = tracer('tournament')
+    if workers is None and cache is None:
+        # 2 initiate the seed
+        random.seed(random_state)
+        _who = {x.idnum: set([y.idnum for y in lstOfStrat])
+                for x in lstOfStrat}
+        # 3 perform multi_eval
+        for w in lstOfStrat:
+            lst = [x for x in lstOfStrat if x.idnum in _who[w.idnum]]
+            for _ in lstOfStrat: _who[_.idnum].discard(w.idnum)
+            _score = multi_eval(w, lst, *_params)
+            if _trace is not None: _trace(">> résultat {}".format(_score))
+            _results.extend([(w.idnum, x, v) for x,v in _score])
+    else:
+        # 2 the pairings sorted, smaller idnum first, whatever the order
+        _lst = list(lstOfStrat)
+        _pairs = sorted([(w, x) if w.idnum <= x.idnum else (x, w)
+                         for i,w in enumerate(_lst) for x in _lst[i:]],
+                        key=lambda p: (p[0].idnum, p[1].idnum))
+        _args = ([w for w,_ in _pairs], [x for _,x in _pairs],
+                 [pair_seed(random_state, w.idnum, x.idnum)
+                  for w,x in _pairs],
+                 [_params for _ in _pairs])
+        # 3 perform the evaluations, results keep the pairings order
+        if cache is not None:
+            _values = cache.evaluate_many(_pairs, *_params,
+                                          seed=random_state, workers=workers)
+        elif workers <= 1:
+            _values = list(map(_pair_evaluation, *_args))
+        else:
+            _chunk = max(1, len(_pairs) // (4*workers))
+            with ProcessPoolExecutor(max_workers=workers) as _pool:
+                _values = list(_pool.map(_pair_evaluation, *_args,
+                                         chunksize=_chunk))
+        _results = [(w.idnum, x.idnum, v)
+                    for (w,x),v in zip(_pairs, _values)]
+
+    for w,x,v in _results: # idnum, idnum, (v1, v2)
+        _scores[w] = _scores.get(w, 0)+v[0]
+        if x != w: # do not count twice
+            _scores[x] = _scores.get(x, 0)+v[1]
+
+    if _trace is not None:
+        _match = {x.idnum:0 for x in lstOfStrat}
+        for w,x,_ in _results:
+            _match[w] += 1
+            if x != w: _match[x] +=1
+        _trace(">> rencontres {}".format(_match))
     return sorted(list(_scores.items()), key=lambda x:x[0])
             
 
@@ -198,12 +268,13 @@ def is_learner(st:Strategy):
 
 def learning(st1:Strategy, st2:Strategy, nbMatch:int=10, 
                min_iter:int=1, max_iter:int=100, model:Model=m2,
-               epsilon:float=0) -> tuple:
+               epsilon:float=0, keep:bool=False) -> tuple:
     """ given 2 Strategies st1, st2
               requires st1 to be a learner
         given nbMatch [the encounter repetition]
         given min_iter, max_iter [the interval length of encounters]
         given a Model model [without or with action 'GiveUp']
+        given keep [True: the learners go on with what they know]
 
         return the points for st1 and st2 of nbMatch with at least min_iter 
         at most max_iter iterations, their might be miscomprehension if
@@ -218,6 +289,7 @@ def learning(st1:Strategy, st2:Strategy, nbMatch:int=10,
         raise ValueError("can't have the same instance for both")
         
     _epsilon = min(max(epsilon, 0), 1)
+    _trace = tracer('evaluation')
     rewards = model.rewards
     valeurs = model.values
     _sts = st1, st2
@@ -226,8 +298,9 @@ def learning(st1:Strategy, st2:Strategy, nbMatch:int=10,
     total_noise = [0, 0]
     total_guess = [] if not _st2_learner else [ [], [] ]
     total_default = [] if not _st2_learner else [ [], [] ]
-    st1.reset_learning()
-    if _st2_learner: st2.reset_learning()
+    if not keep:
+        st1.reset_learning()
+        if _st2_learner: st2.reset_learning()
     for i in range(nbMatch):
         eval_st = [0,0]
         for k in range(2): _sts[k].reset() # reset the info
@@ -268,8 +341,8 @@ def learning(st1:Strategy, st2:Strategy, nbMatch:int=10,
             total_default[1].append(st2.default_behavior)
             
 
-    if DEBUG:
-        print("Match {}, noises {}".format(nbMatch, total_noise))
+    if _trace is not None:
+        _trace("Match {}, noises {}".format(nbMatch, total_noise))
     # if strategies are identical, the total is twice the value
     if not _st2_learner and st1.default == st2: total_st[1] /= 2
     # mean score
@@ -296,13 +369,14 @@ def adaptive_evaluation(st1:Strategy, st2:Strategy, nbMatch:int=10,
                                     model, epsilon)
             _st_id = st1.idnum
             
-        if len(_0) == 2:
+        _trace = tracer('learning')
+        if _trace is not None and len(_0) == 2:
             for _ in range(2):
-                print(">> default behavior(s) strat {}: {}".format(_, _0[_]))
-                print(">> good guess(es) strat {}: {}".format(_, _1[_]))
-        else:
-            print(">> default behavior(s) strat {}".format(_st_id), _0)
-            print(">> good guess(es) strat {}".format(_st_id), _1)
+                _trace(">> default behavior(s) strat {}: {}".format(_, _0[_]))
+                _trace(">> good guess(es) strat {}: {}".format(_, _1[_]))
+        elif _trace is not None:
+            _trace(">> default behavior(s) strat {} {}".format(_st_id, _0))
+            _trace(">> good guess(es) strat {} {}".format(_st_id, _1))
 
     return _rep
 
@@ -6,6 +6,22 @@ except:
     try: from tools.evaluations import *
     except:
         print("evaluations.py is missing")
-        
-DEBUG = False
+from functools import wraps
 
+__usage__ = """
+    The evaluations of evaluations.py, no callback is called during
+    their run, even if some are registered (see verbosity.py)
+"""
+
+def _muted(f):
+    """ f without any trace """
+    @wraps(f)
+    def _f(*args, **kwargs):
+        with muted(): return f(*args, **kwargs)
+    return _f
+
+evaluation = _muted(evaluation)
+multi_eval = _muted(multi_eval)
+tournament = _muted(tournament)
+learning = _muted(learning)
+adaptive_evaluation = _muted(adaptive_evaluation)
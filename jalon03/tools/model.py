@@ -11,8 +11,16 @@ try:
 except:
     from tools.ezCLI import testcode
 from numbers import Number
+from types import MappingProxyType
+import itertools
+try:
+    import numpy as np
+except:
+    np = None # encode_many and decode_many need numpy
 #============================= Le Modèle du Jeu ========================#
 class Model:
+    TABLE_LENGTH = 4 # words up to this length are in the lookup tables
+
     def __init__(self, rewards:dict, values:dict):
         """ 
             from rewards and values
@@ -29,6 +37,17 @@ class Model:
             one method
 	        self.get_actions(rew:str) -> str : 
                   given rewards provides the actions involved
+
+            encoding/decoding of the words of rewards use lookup tables
+            for the words of len <= table_length
+
+            numeric view (ro, built once)
+                self.action_codes, self.reward_codes :
+                  the position in actions, in reward_names
+                self.payoff[a1, a2] : the 2 reward codes
+                self.value[r] : the numeric value of the reward code r
+                self.my_action[r], self.adv_action[r] :
+                  the action codes involved, -1 if more than one
         """
         self.__recompenses = set(''.join([x for x in rewards.values()]))
         self.__actions = set(''.join([x for x in rewards.keys()]))
@@ -53,6 +72,20 @@ class Model:
                 self.__rewact[k] = self.__rewact[k].pop()
 
         self.__keys = None
+        self.__length = self.TABLE_LENGTH
+        self.__words = None
+        self.__codes = None
+
+    @property
+    def table_length(self) -> int:
+        """ the max len of the words in the lookup tables """
+        return self.__length
+    @table_length.setter
+    def table_length(self, v:int):
+        if not isinstance(v, int) or v < 0:
+            raise ValueError(f"{v} is not a positive int")
+        self.__length = v
+        self.__words = None
 
     @property
     def rewards(self) -> dict:
@@ -71,6 +104,57 @@ class Model:
         """ the rewards as string in lexicographic order """
         return ''.join(sorted(list(self.__recompenses)))
 
+    def __build_codes(self):
+        """ set the numeric view once, arrays are read only """
+        _acts, _rews = self.actions, self.reward_names
+        _n = len(_acts)
+        _payoff = np.zeros(shape=(_n, _n, 2), dtype=np.int8)
+        for k,v in self.__rewards.items():
+            _payoff[_acts.index(k[0]), _acts.index(k[1])] = [
+                _rews.index(x) for x in v]
+        _value = np.array([self.__values[x] for x in _rews], dtype=float)
+        _mine = np.full(len(_rews), -1, dtype=np.int8)
+        _adv = np.full(len(_rews), -1, dtype=np.int8)
+        for i,x in enumerate(_rews):
+            _1 = self.get_actions(x)
+            if isinstance(_1, str) and len(_1) == 2:
+                _mine[i], _adv[i] = _acts.index(_1[0]), _acts.index(_1[1])
+        for _ in (_payoff, _value, _mine, _adv): _.flags.writeable = False
+        self.__codes = ({x: i for i,x in enumerate(_acts)},
+                        {x: i for i,x in enumerate(_rews)},
+                        _payoff, _value, _mine, _adv)
+
+    @property
+    def action_codes(self) -> dict:
+        """ ro dict: keys are actions, values are their codes """
+        if self.__codes is None: self.__build_codes()
+        return MappingProxyType(self.__codes[0])
+    @property
+    def reward_codes(self) -> dict:
+        """ ro dict: keys are rewards, values are their codes """
+        if self.__codes is None: self.__build_codes()
+        return MappingProxyType(self.__codes[1])
+    @property
+    def payoff(self) -> 'np.ndarray':
+        """ payoff[a1, a2]: the reward codes of both players """
+        if self.__codes is None: self.__build_codes()
+        return self.__codes[2]
+    @property
+    def value(self) -> 'np.ndarray':
+        """ value[r]: the numeric value of the reward code r """
+        if self.__codes is None: self.__build_codes()
+        return self.__codes[3]
+    @property
+    def my_action(self) -> 'np.ndarray':
+        """ my_action[r]: my action code for the reward code r """
+        if self.__codes is None: self.__build_codes()
+        return self.__codes[4]
+    @property
+    def adv_action(self) -> 'np.ndarray':
+        """ adv_action[r]: adversary action code for the reward code r """
+        if self.__codes is None: self.__build_codes()
+        return self.__codes[5]
+
     def get_actions(self, rew) -> str:
         """ for a given reward send the actions involved 
             1st is mine, 2nd is adversary
@@ -86,9 +170,28 @@ class Model:
         if len(self.__keys) == 5:
             self.__keys = self.__keys[:2]+self.__keys[3:]
         
+    def __build_tables(self):
+        """ index -> word, word -> index up to table_length
+            digits[r]: 1+position of reward code r in keys, 0 if none
+        """
+        if self.__keys is None: self.__build_keys()
+        self.__words = [''.join(_) for i in range(self.table_length+1)
+                        for _ in itertools.product(self.__keys, repeat=i)]
+        self.__index = {w: i for i,w in enumerate(self.__words)}
+        self.__digits = [self.__keys.find(x)+1 for x in self.reward_names]
+        # first index of the words of len i
+        self.__offset = [(4**i-1)//3 for i in range(self.table_length+2)]
+
     def encoding(self, word:str) -> int:
         """ given a word of rews, 
            return its index if exists else -1 """
+        if self.__words is None: self.__build_tables()
+        _1 = self.__index.get(word, None)
+        if _1 is not None: return _1
+        return self.__encoding(word)
+
+    def __encoding(self, word:str) -> int:
+        """ encoding without the tables """
         def oneKey(rew:str) -> int:
             """ the index of rew in self.__keys, else -1 """
             return (self.__keys.find(rew)
@@ -104,14 +207,66 @@ class Model:
 
     def decoding(self, idx:int) -> str:
         """ return the memory values corresponding to idx """
-        if self.__keys is None: self.__build_keys()
+        if self.__words is None: self.__build_tables()
+        if 0 <= idx < len(self.__words): return self.__words[idx]
         _mem = ''
         while idx > 0:
             _ = (idx-1)%4
             idx = (idx-1)//4
             _mem = self.__keys[_]+_mem
         return _mem
+
+    def encode_next(self, idx:int, rew:str, length:int) -> int:
+        """ the index of (word+rew)[-length:] where idx is the index
+            of word, a memory of size at most length
+            -1 when idx is -1 or rew is not a key, such a memory
+            has to be encoded again
+        """
+        if self.__words is None: self.__build_tables()
+        if length == 0: return 0
+        # the digit of rew, as in __digits: the tables may be too short
+        _d = self.__keys.find(rew)+1 if len(rew) == 1 else 0
+        if idx < 0 or _d == 0: return -1
+        if length > self.table_length: # too long for the offsets
+            return self.encoding((self.decoding(idx)+rew)[-length:])
+        _off = self.__offset[length]
+        if idx >= _off: # full memory, the oldest reward is dropped
+            _p = 4**(length-1)
+            idx -= ((idx - _off) // _p + 1) * _p
+        return idx*4+_d
+
+    def encode_many(self, codes:'np.ndarray') -> 'np.ndarray':
+        """ codes: array (..., len) of reward codes, the position in
+            reward_names ; negative codes are empty places
+            return the index of each word, -1 if a reward is not a key
+        """
+        if self.__words is None: self.__build_tables()
+        _codes = np.asarray(codes, dtype=int)
+        _digits = np.array(self.__digits+[0], dtype=np.int64)
+        _d = _digits[np.where(_codes < 0, -1, _codes)]
+        _valid = _codes >= 0
+        _idx = np.zeros(_codes.shape[:-1], dtype=np.int64)
+        for j in range(_codes.shape[-1]):
+            _idx = np.where(_valid[...,j], _idx*4+_d[...,j], _idx)
+        return np.where((_valid & (_d == 0)).any(axis=-1), -1, _idx)
+
+    def decode_many(self, idx:'np.ndarray') -> 'np.ndarray':
+        """ the words of each index, as an array of str """
+        if self.__words is None: self.__build_tables()
+        _idx = np.asarray(idx, dtype=np.int64)
+        _words = np.array(self.__words, dtype=object)
+        _in = (0 <= _idx) & (_idx < len(self.__words))
+        _1 = _words[np.where(_in, _idx, 0)]
+        for i in zip(*np.nonzero(~_in)):
+            _1[i] = self.decoding(int(_idx[i]))
+        return _1
             
+    def __getstate__(self) -> dict:
+        """ the numeric view is built again, read only """
+        _state = self.__dict__.copy()
+        _state['_Model__codes'] = None
+        return _state
+
     def __repr__(self) -> str:
         return ("{0}({1.rewards}, {1.values})"
                 .format(self.__class__.__name__, self))
@@ -235,4 +390,17 @@ _2 = [ m1.encoding(_) for _ in _1 ]
 _2 == list(range(85))
 _3 = [m1.decoding(_) for _ in _2]
 _3 == _1
+len([m1.decoding(_) for _ in range(341)]) == len(set(m1.decoding(_) for _ in range(341)))
+m1.encode_next(m1.encoding("TRP"), 'S', 3) == m1.encoding("RPS")
+m1.encode_next(m1.encoding("T"), 'S', 3) == m1.encoding("TS")
+m2.encode_next(m2.encoding("TR"), 'A', 3)
+_c = [[m2.reward_names.index(x) for x in w] for w in ("TRP", "SSS", "TAP")]
+m2.encode_many(_c).tolist() == [m2.encoding(w) for w in ("TRP", "SSS", "TAP")]
+m2.encode_many([[-1, -1, 4], [-1, 3, 4]]).tolist() == [m2.encoding("T"), m2.encoding("ST")]
+m2.decode_many([[0, 1], [85, 1000]]).tolist() == [[m2.decoding(x) for x in _] for _ in ([0, 1], [85, 1000])]
+
+m2.action_codes, m2.reward_codes
+all([m2.reward_names[m2.payoff[m2.action_codes[k[0]], m2.action_codes[k[1]]][i]] == v[i] for k,v in m2.rewards.items() for i in range(2)])
+m2.value.tolist() == [m2.values[x] for x in m2.reward_names]
+m2.my_action.tolist(), m2.adv_action.tolist()
 """ ; testcode(code)
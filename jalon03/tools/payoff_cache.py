@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = """
+
+    A cache for the results of the pairings, shared by tournament,
+    eco_evol and World
+
+    * fingerprint(st)
+    a string built from the class of st and its parameters, not from
+    its idnum: style, memory_limit, model and the parameters listed
+    for its class in PARAMETERS (e.g. Periodic.word)
+    two equivalent strategies have the same fingerprint
+    a learner is defined by its class, its memory, its default
+    behavior and what it has learned (export_state)
+    the strategies of an unknown class are not shared, their
+    fingerprint uses their idnum, see register_parameters
+
+    * register_parameters(klass, *names)
+    the properties that, with the common ones, define the behavior
+    of the strategies of klass
+
+    * PayoffCache(maxsize, filename)
+    keys are (fingerprint, fingerprint, same instance, model, nbMatch,
+              min_iter, max_iter, epsilon, evaluator, seed)
+    values are the pair of scores
+    the maxsize most recent keys are kept in memory (LRU)
+    if filename is provided, a sqlite database stores every key with a
+    seed, so that the results can be reused by other runs ; without
+    seed, a result is one random run among others and stays in memory
+
+    each pairing is evaluated with the smaller fingerprint first and
+    its own seed, derived from seed and both fingerprints: the result
+    only depends on the key
+"""
+
+#--------------- import -----------------#
+import copy
+import hashlib
+import random
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from evaluations import *
+    from evaluations import _pair_evaluation
+except:
+    from tools.evaluations import *
+    from tools.evaluations import _pair_evaluation
+#========================================#
+
+# class name -> the properties given by the constructor, other than
+# style, memory_limit and model
+PARAMETERS = {
+    # jalon01
+    'Gentle': (), 'Bad': (), 'Fool': (), 'GentleSulky': (),
+    'BadSulky': (), 'FoolSulky': (), 'Tit4Tat': (),
+    'WinStayLooseShift': (), 'Pavlov': (),
+    # jalon02
+    'Periodic': ('word',), 'Majority': (), 'Markov': ('probabilities',),
+    'Stochastic': ('probabilities',),
+    'Gradual': ('additive', 'cooling', 'rate', 'abort'),
+    # jalon03
+    'Automaton': ('rules',),
+    }
+
+def register_parameters(klass, *names):
+    """ klass (or its name) is defined by the properties names """
+    _name = klass if isinstance(klass, str) else klass.__qualname__
+    PARAMETERS[_name] = tuple(names)
+
+def _qualname(obj) -> str:
+    """ module and qualified name of a class or a function """
+    return "{0.__module__}.{0.__qualname__}".format(obj)
+
+def fingerprint(st:Strategy) -> str:
+    """ the class and the parameters of st, as a short string
+        learners are defined by their memory, their default behavior
+        and their learned state
+    """
+    _klass = _qualname(st.__class__)
+    if is_learner(st):
+        _st = copy.deepcopy(st)
+        _st.reset() # what is learned, not the current match
+        _learned = hashlib.sha1(_st.export_state()).hexdigest()
+        _desc = (_klass, st.memory_limit, fingerprint(st.default), _learned)
+    elif st.__class__.__qualname__ in PARAMETERS:
+        _desc = [_klass, st.style, st.memory_limit, repr(st._model)]
+        for k in PARAMETERS[st.__class__.__qualname__]:
+            _desc.append((k, repr(getattr(st, k))))
+    else: # unknown parameters, not shared
+        _desc = (_klass, st.idnum)
+    return hashlib.sha1(repr(_desc).encode()).hexdigest()
+
+class PayoffCache:
+    """ LRU storage of the pairings' scores, with an optional sqlite file
+    """
+    def __init__(self, maxsize:int=4096, filename:str=None):
+        """ maxsize: number of keys kept in memory
+            filename: the sqlite file, None means no file
+        """
+        self.__maxsize = max(1, maxsize)
+        self.__data = OrderedDict()
+        self.__hits = self.__misses = 0
+        self.__pending = 0
+        self.__db = None
+        if filename is not None:
+            self.__db = sqlite3.connect(filename)
+            self.__db.execute("CREATE TABLE IF NOT EXISTS payoffs "
+                              "(key TEXT PRIMARY KEY, v1 REAL, v2 REAL)")
+
+    def __len__(self) -> int:
+        """ number of keys in memory """
+        return len(self.__data)
+
+    def __contains__(self, key:tuple) -> bool:
+        """ True if key is in memory or in the file """
+        return self.get(key, False) is not None
+
+    @property
+    def maxsize(self) -> int:
+        """ the max number of keys in memory """
+        return self.__maxsize
+    @property
+    def hits(self) -> int:
+        """ number of successful lookups """
+        return self.__hits
+    @property
+    def misses(self) -> int:
+        """ number of failed lookups """
+        return self.__misses
+
+    def key(self, st1:Strategy, st2:Strategy, nbMatch:int=10,
+            min_iter:int=1, max_iter:int=100, model:Model=m2,
+            epsilon:float=0, seed:int=None,
+            evaluator=adaptive_evaluation) -> tuple:
+        """ the key of a pairing, the smaller fingerprint first """
+        _params = (nbMatch, min_iter, max_iter, model, epsilon)
+        _fp = fingerprint(st1), fingerprint(st2)
+        return self.__pairing(st1, st2, _fp, _params, seed, evaluator)[1]
+
+    def get(self, key:tuple, count:bool=True) -> tuple:
+        """ the scores stored for key, None if unknown """
+        _1 = self.__data.get(key, None)
+        if _1 is None and self.__db is not None and key[-1] is not None:
+            _row = self.__db.execute("SELECT v1, v2 FROM payoffs WHERE key=?",
+                                     (repr(key),)).fetchone()
+            if _row is not None:
+                _1 = tuple(_row)
+                self.__store(key, _1)
+        if _1 is not None: self.__data.move_to_end(key)
+        if count:
+            if _1 is None: self.__misses += 1
+            else: self.__hits += 1
+        return _1
+
+    def put(self, key:tuple, value:tuple):
+        """ store the scores of key """
+        self.__store(key, tuple(value))
+        if self.__db is not None and key[-1] is not None:
+            self.__db.execute("INSERT OR REPLACE INTO payoffs VALUES (?,?,?)",
+                              (repr(key), value[0], value[1]))
+            self.__pending += 1
+            if self.__pending >= 100: self.flush()
+
+    def __store(self, key:tuple, value:tuple):
+        """ memory part, remove the least recently used """
+        self.__data[key] = value
+        self.__data.move_to_end(key)
+        while len(self.__data) > self.maxsize:
+            self.__data.popitem(last=False)
+
+    def flush(self):
+        """ write the pending values to the file """
+        if self.__db is not None and self.__pending > 0:
+            self.__db.commit()
+        self.__pending = 0
+
+    def close(self):
+        """ flush and release the file """
+        self.flush()
+        if self.__db is not None: self.__db.close()
+        self.__db = None
+
+    def clear(self):
+        """ empty the memory, the file is left untouched """
+        self.__data.clear()
+        self.__hits = self.__misses = 0
+
+    def __pairing(self, st1:Strategy, st2:Strategy, fp:tuple,
+                  params:tuple, seed:int, evaluator) -> tuple:
+        """ canonical order of a pairing, fp are the fingerprints
+            return (swapped, key, st1, st2, seed of the pairing)
+        """
+        _fp = list(fp)
+        _swap = _fp[1] < _fp[0]
+        if _swap: st1, st2 = st2, st1 ; _fp.reverse()
+        _key = (_fp[0], _fp[1], st1 == st2, repr(params[3]),
+                *params[:3], params[4], _qualname(evaluator), seed)
+        return _swap, _key, st1, st2, pair_seed(seed, *_fp)
+
+    def evaluate(self, st1:Strategy, st2:Strategy, nbMatch:int=10,
+                 min_iter:int=1, max_iter:int=100, model:Model=m2,
+                 epsilon:float=0, seed:int=None,
+                 evaluator=adaptive_evaluation) -> tuple:
+        """ the scores of st1, st2, evaluated only if unknown
+            the random state of the caller is left untouched
+        """
+        _params = (nbMatch, min_iter, max_iter, model, epsilon)
+        _fp = fingerprint(st1), fingerprint(st2)
+        _swap, _key, _1, _2, _seed = self.__pairing(st1, st2, _fp,
+                                                    _params, seed,
+                                                    evaluator)
+        _v = self.get(_key)
+        if _v is None:
+            _state = random.getstate()
+            random.seed(_seed)
+            _v = evaluator(_1, _2, *_params)
+            random.setstate(_state)
+            self.put(_key, _v)
+        return _v[::-1] if _swap else _v
+
+    def evaluate_many(self, pairs:Iterable, nbMatch:int=10,
+                      min_iter:int=1, max_iter:int=100, model:Model=m2,
+                      epsilon:float=0, seed:int=None,
+                      workers:int=None) -> list:
+        """ the scores for each (st1, st2) in pairs
+            the unknown keys are evaluated once, by workers processes
+            if workers is greater than 1
+        """
+        _params = (nbMatch, min_iter, max_iter, model, epsilon)
+        _pairs = list(pairs)
+        # one fingerprint per instance, they are alive during the call
+        _fps = {id(x): fingerprint(x) for _ in _pairs for x in _}
+        # the workers call adaptive_evaluation (_pair_evaluation)
+        _pairs = [self.__pairing(st1, st2, (_fps[id(st1)], _fps[id(st2)]),
+                                 _params, seed, adaptive_evaluation)
+                  for st1,st2 in _pairs]
+        _found = {}
+        _todo = {}
+        for _,k,st1,st2,s in _pairs:
+            if k in _found or k in _todo: continue
+            _v = self.get(k)
+            if _v is None: _todo[k] = (st1, st2, s)
+            else: _found[k] = _v
+        _args = ([_[0] for _ in _todo.values()],
+                 [_[1] for _ in _todo.values()],
+                 [_[2] for _ in _todo.values()],
+                 [_params for _ in _todo])
+        _state = random.getstate()
+        if workers is None or workers <= 1:
+            _values = list(map(_pair_evaluation, *_args))
+        else:
+            _chunk = max(1, len(_todo) // (4*workers))
+            with ProcessPoolExecutor(max_workers=workers) as _pool:
+                _values = list(_pool.map(_pair_evaluation, *_args,
+                                         chunksize=_chunk))
+        random.setstate(_state)
+        for k,v in zip(_todo, _values):
+            self.put(k, v)
+            _found[k] = v
+        self.flush()
+        return [_found[k][::-1] if _swap else _found[k]
+                for _swap,k,_,_,_ in _pairs]
+
+if __name__ == "__main__":
+    print(__usage__)
+    class Periodic(Strategy):
+        """ plays word periodically """
+        def __init__(self, word:str):
+            self.__word = word
+            super().__init__(1 if word[0] == 'C' else -1)
+        @property
+        def word(self) -> str: return self.__word
+        def next_action(self): return self.__word[self.count%len(self.__word)]
+
+    from ezCLI import testcode
+    code = """
+fingerprint(Periodic('CD')) == fingerprint(Periodic('CD'))
+fingerprint(Periodic('CD')) != fingerprint(Periodic('CCD'))
+lst = [Periodic('CD'), Periodic('CCD'), Periodic('D')]
+c = PayoffCache(maxsize=4)
+tournament(lst, 5, 1, 10, m1, 0, 42, cache=c)
+c.hits, c.misses, len(c)
+tournament(lst, 5, 1, 10, m1, 0, 42, cache=c)
+c.hits, c.misses, len(c)
+c.evaluate(lst[0], Periodic('CD'), 5, 1, 10, m1, 0, 42)
+""" ; testcode(code)
@@ -25,6 +25,11 @@ try:
 except:
     from tools.evaluations_muettes import adaptive_evaluation as evaluation
 
+try:
+    from verbosity import tracer
+except:
+    from tools.verbosity import tracer
+
 try:
     from base import Strategy
 except:
@@ -35,7 +40,11 @@ except:
         Strategy = 'Strategy'
     
 import random
+import pickle
+import weakref
 import numpy as np
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     import matplotlib.pyplot as plt
@@ -77,6 +86,115 @@ def symetric(sz, x, dx):
 def fixe(sz, x, dx):
     """ boundaries cant be bypassed """
     if 0 <= x+dx < sz: return x+dx
+
+#================= scores and parallel steps =================#
+def averages(rows:np.ndarray, matrix:np.ndarray,
+             table:np.ndarray, cells:np.ndarray) -> np.ndarray:
+    """ the average score of cells against their neighbors (table)
+        rows: the row in matrix of each position, -1 if empty
+    """
+    # same order of summation as a scan, neighbor after neighbor
+    _me = rows[cells]
+    _scores = np.zeros(len(cells))
+    _nb = np.zeros(len(cells), dtype=int)
+    for k in range(table.shape[1]):
+        _adv = rows[table[cells,k]]
+        _ok = (_me >= 0) & (_adv >= 0)
+        _scores[_ok] += matrix[_me[_ok], _adv[_ok]]
+        _nb += _ok
+    return np.where(_nb > 0, _scores / np.maximum(_nb, 1), 0.)
+
+def candidates(scores:np.ndarray, table:np.ndarray,
+               cells:np.ndarray) -> tuple:
+    """ the cells (among cells) having a better neighbor and, for
+        each of them, the mask of its best neighbors
+    """
+    _scores = np.append(scores, -np.inf)[table[cells]]
+    _best = _scores.max(axis=1)
+    _ch = _best > scores[cells]
+    return cells[_ch], _scores[_ch] == _best[_ch, None]
+
+# worker side of Bands: numpy views on the shared buffers
+_SHARED = {}
+
+def _attach(specs:dict):
+    """ open the shared buffers, once per worker """
+    for k,(name, shape, dtype) in specs.items():
+        _shm = shared_memory.SharedMemory(name=name)
+        _SHARED[k] = (_shm, np.ndarray(shape, dtype=dtype, buffer=_shm.buf))
+
+def _band_scores(band:tuple):
+    """ scores of the cells of band, written in place """
+    _cells = np.arange(*band)
+    _v = {k: v[1] for k,v in _SHARED.items()}
+    _v['scores'][band[0]:band[1]] = averages(_v['rows'], _v['matrix'],
+                                             _v['table'], _cells)
+
+def _band_candidates(band:tuple) -> tuple:
+    """ candidates of the cells of band """
+    _v = {k: v[1] for k,v in _SHARED.items()}
+    return candidates(_v['scores'], _v['table'], np.arange(*band))
+
+class Bands:
+    """ worker processes that step a World by bands of lines
+        the neighbor table, the rows of the cells, the matrix of
+        payoffs and the scores are in shared memory: a band reads the
+        lines it needs (its halo, given by the neighbor table, hence
+        by the boundary functions) where they are, nothing is copied
+    """
+    def __init__(self, table:np.ndarray, nbc:int, nkeys:int,
+                 workers:int):
+        _area = table.shape[0]
+        _specs = {'table': (table.shape, np.intp),
+                  'rows': ((_area+1,), np.intp),
+                  'matrix': ((nkeys, nkeys), float),
+                  'scores': ((_area,), float)}
+        self.__shm = {}
+        self.__views = {}
+        for k,(shape, dtype) in _specs.items():
+            _sz = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            self.__shm[k] = shared_memory.SharedMemory(create=True, size=_sz)
+            self.__views[k] = np.ndarray(shape, dtype=dtype,
+                                         buffer=self.__shm[k].buf)
+        self.__views['table'][:] = table
+        # bands of whole lines, two per worker
+        _nbl = _area // nbc
+        _cuts = np.linspace(0, _nbl, min(_nbl, 2*workers)+1).astype(int)
+        self.__bands = [(a*nbc, b*nbc) for a,b in zip(_cuts, _cuts[1:])
+                        if b > a]
+        self.__pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach,
+            initargs=({k: (self.__shm[k].name, v.shape, v.dtype)
+                       for k,v in self.__views.items()},))
+        self.__nkeys = nkeys
+        self.__workers = workers
+
+    @property
+    def nkeys(self) -> int: return self.__nkeys
+    @property
+    def workers(self) -> int: return self.__workers
+
+    def step(self, rows:np.ndarray, matrix:np.ndarray) -> tuple:
+        """ the scores of every cell, the cells to replace and the
+            mask of their best neighbors (see candidates)
+        """
+        self.__views['rows'][:] = rows
+        self.__views['matrix'][:] = matrix
+        list(self.__pool.map(_band_scores, self.__bands))
+        _res = list(self.__pool.map(_band_candidates, self.__bands))
+        _change = np.concatenate([_[0] for _ in _res])
+        _cand = np.concatenate([_[1] for _ in _res])
+        return self.__views['scores'].copy(), _change, _cand
+
+    def close(self):
+        """ stop the workers, release the shared buffers """
+        if self.__pool is None: return
+        self.__pool.shutdown()
+        self.__pool = None
+        self.__views.clear()
+        for _ in self.__shm.values():
+            _.close() ; _.unlink()
+
 #=============================================================#
 
 class World:
@@ -93,6 +211,10 @@ class World:
                            1 : line_fixe column_mirror
                            2 : line_fixe column_symetric
                            3 : line_fixe column_cyclic
+                           4*i+j : line FUNS[i] column FUNS[j]
+
+            mirror and symetric require |dx| <= nbl/2, |dy| <= nbc/2
+            for each (dx, dy) of the vicinity, ValueError otherwise
         """
         self.__constraint = min(len(self.FUNS)**2-1, max(constraint, 0))
         self.__nbl = max(3, nbl)
@@ -112,18 +234,47 @@ class World:
         self.__strategies = lstOfStrat
         self.__agents_names = {x.idnum: x.__class__.__name__
                                for x in self.__strategies}
+        # a PayoffCache survives reset and can be shared between worlds
+        self.__cache = None
+        self.__generator = None
+        self.__bands = None # see workers
+        # the neighbors of each cell, computed once
+        self.__table = self.__build_table()
+        self.__reverse = None # see __spread
         self.reset()
         
     def reset(self):
         ''' flush the world and agents' location '''
         # the dictionnary of strategies, indexed by their idnum
         self.__pop = {x.idnum: x for x in self.__strategies}
-        # the grid is a np.array of empty cells
-        self.__grid = -1 * np.ones(shape=(self.__nbl, self.__nbc))
-        print(self.__grid.shape)
+        # the grid is a np.array of empty cells (-1)
+        self.__grid = np.full((self.__nbl, self.__nbc), -1,
+                              dtype=self.__dtype())
+        _trace = tracer('world')
+        if _trace is not None: _trace(str(self.__grid.shape))
+        # census[idnum+1] is the number of cells of idnum, None=unknown
+        self.__census = None
+        # what is kept from a step to the next one, see __frontier_step
+        self.__frontier = None
+        self.__changed = 0 # number of cells changed by the last step
+        self.__generation = 0
+        self.__stable = False # the last loop (or run) reached stability
+        self.__random = None # state of random, see from_checkpoint
         self.__scores = {}
         self.__store = None
         
+    def __dtype(self) -> type:
+        """ int16 if every idnum fits, int32 otherwise """
+        _max = max(self.__pop, default=0)
+        return np.int16 if _max < np.iinfo(np.int16).max else np.int32
+
+    def __fit(self, idnum:int):
+        """ the grid is made wider if idnum does not fit """
+        if idnum >= np.iinfo(self.__grid.dtype).max:
+            self.__grid = self.__grid.astype(np.int32)
+        self.__census = None
+        self.__frontier = None
+
     def __str__(self):
         """ display the colors of the inhabitants """
         _tmp = np.zeros(shape=self.__grid.shape, dtype=int)
@@ -175,32 +326,95 @@ class World:
         """ compute the absolute coords of neighborhood 
             for a given x, y drop non coordinates 
         """
-        x,y = coord
-        return [(a,b) for a,b in [ (self.lines(x,dx), self.columns(y,dy))
-                                 for dx,dy in self.neighbors ]
-                if a is not None and b is not None ]
+        _p = self.__c2p(*coord)
+        return [self.__p2c(int(p)) for p in self.__table[_p]
+                if p < self.area]
 
     @property
     def population(self) -> dict:
         """ the repartition of the population """
-        _sz = {}
-        for i in range(self.nb_lines):
-            for j in range(self.nb_columns):
-                x = self.__grid[i,j]
-                x = x if x >= 0 else 'vide'
-                _sz[x] = _sz.get(x, 0) +1
-        return _sz
+        _census = self.__get_census()
+        return {('vide' if i == 0 else i-1): int(_census[i])
+                for i in np.nonzero(_census)[0].tolist()}
+
+    def __get_census(self) -> np.ndarray:
+        """ census[idnum+1]: the number of cells of idnum, index 0 is
+            for the empty cells ; computed once then kept up to date
+        """
+        if self.__census is None:
+            _n = max(self.__pop, default=0)+2
+            self.__census = np.bincount(self.__grid.ravel().astype(np.intp)
+                                        +1, minlength=_n)
+        return self.__census
 
     def describe(self):
         ''' display the class name of agents '''
         return self.__agents_names
     def save(self):
         """ save the current repartition """
-        self.__store = self.__grid[:]
+        self.__store = self.__grid.copy()
 
     def restore(self):
         """ restore the previous state if it exists """
-        if self.__store is not None: self.__grid = self.__store[:]
+        if self.__store is not None: self.__grid = self.__store.copy()
+        self.__census = None
+        self.__frontier = None
+
+    @property
+    def generation(self) -> int:
+        """ number of generations done by the last loop (or run) """
+        return self.__generation
+
+    def checkpoint(self, filename:str):
+        """ write in filename (npz) what is needed to resume a loop:
+            grid, pop, parameters, evaluations, generation and the
+            states of random and of generator
+            the cache and the workers are not saved
+        """
+        _pairs = list(self.__scores.items())
+        _state = {'init': (self.__strategies, self.__neighborhood,
+                           self.__nbl, self.__nbc, self.__constraint),
+                  'pop': self.__pop, 'params': self.__sim_params,
+                  'generation': (self.__generation, self.__stable),
+                  'random': random.getstate(), 'generator': self.generator}
+        np.savez_compressed(filename, grid=self.__grid,
+                            pairs=np.array([k for k,_ in _pairs],
+                                           dtype=np.int64).reshape(-1, 2),
+                            values=np.array([v for _,v in _pairs],
+                                            dtype=float).reshape(-1, 2),
+                            state=np.frombuffer(pickle.dumps(_state),
+                                                dtype=np.uint8))
+
+    @staticmethod
+    def from_checkpoint(filename:str) -> 'World':
+        """ the World written by checkpoint, loop(resume=True) (or
+            run) goes on from the saved generation
+        """
+        with np.load(filename) as _f:
+            _state = pickle.loads(_f['state'].tobytes())
+            _grid, _pairs, _values = _f['grid'], _f['pairs'], _f['values']
+        _w = World(*_state['init'])
+        _w.__pop = _state['pop']
+        _w.__grid = _grid.copy()
+        _w.__sim_params = _state['params']
+        _w.__scores = {tuple(k): tuple(v) for k,v in zip(_pairs.tolist(),
+                                                         _values.tolist())}
+        _w.__generation, _w.__stable = _state['generation']
+        _w.__random = _state['random']
+        _w.generator = _state['generator']
+        return _w
+
+    def __start(self, resume:bool) -> tuple:
+        """ seed random, or restore its state when resuming
+            return the first generation and the stability
+        """
+        if not resume:
+            random.seed(self.random_state)
+            self.__generation, self.__stable = 0, False
+        elif self.__random is not None:
+            random.setstate(self.__random)
+        self.__random = None
+        return self.__generation, self.__stable
     #============= simulations parameters ===================#
     def __get_params(self, idx): return self.__sim_params[idx]
     def __set_params(self, idx, v): self.__sim_params[idx] = v
@@ -280,12 +494,54 @@ class World:
         for att,v in zip(_latt.split(), values):
             setattr(self, att, v)
 
+    @property
+    def cache(self) -> 'PayoffCache':
+        """ the shared storage of evaluations, None if not in use """
+        return self.__cache
+    @cache.setter
+    def cache(self, v:'PayoffCache'):
+        """ None or something that can evaluate (see PayoffCache) """
+        if v is None or hasattr(v, 'evaluate'): self.__cache = v
+
+    @property
+    def generator(self) -> np.random.Generator:
+        """ the numpy generator of the random vicinities
+            None: a new one is seeded by random at each step
+        """
+        return self.__generator
+    @generator.setter
+    def generator(self, v:np.random.Generator):
+        """ None or a numpy Generator, reused from step to step """
+        if v is None or isinstance(v, np.random.Generator):
+            self.__generator = v
+
+    @property
+    def workers(self) -> int:
+        """ number of processes for oneStep, None means no process """
+        return None if self.__bands is None else self.__bands.workers
+    @workers.setter
+    def workers(self, v:int):
+        """ None (or less than 2) stops the processes """
+        if self.__bands is not None:
+            self.__bands.close()
+            self.__bands = None
+        if isinstance(v, int) and v > 1:
+            self.__bands = Bands(self.__table, self.__nbc,
+                                 len(self.__pop), v)
+            weakref.finalize(self, self.__bands.close)
+
     def __evaluation(self, st1:Strategy, st2:Strategy):
         """ evaluates and stores """
         _1 = self.__scores.get((st1.idnum, st2.idnum), None)
         if _1 is None:
-            _1 = evaluation(st1, st2, self.nbMatch, self.min_iter,
-                            self.max_iter, self.model, self.noise)
+            if self.cache is None:
+                _1 = evaluation(st1, st2, self.nbMatch, self.min_iter,
+                                self.max_iter, self.model, self.noise)
+            else: # pairings known from earlier runs are reused
+                _1 = self.cache.evaluate(st1, st2, self.nbMatch,
+                                         self.min_iter, self.max_iter,
+                                         self.model, self.noise,
+                                         self.random_state, evaluation)
             self.__scores[(st1.idnum, st2.idnum)] = _1
             self.__scores[(st2.idnum, st1.idnum)] = _1[::-1]
         return _1
@@ -295,22 +551,26 @@ class World:
         """ set agent a in locus (x,y) """
         if a.idnum not in self.__pop:
             self.__pop[a.idnum] = a
+        self.__fit(a.idnum)
         self.__grid[x,y] = a.idnum
 
     def locate_idnum(self, idnum:int, x:int, y:int):
         """ set idnum in locus (x,y) """
         if idnum in self.__pop:
+            self.__fit(idnum)
             self.__grid[x,y] = idnum
 
     def cluster_agent(self, a:Strategy, lstOfCoords:Iterable):
         """ set agent in multiple positions """
         if a.idnum not in self.__pop:
             self.__pop[a.idnum] = a
+        self.__fit(a.idnum)
         for x,y in lstOfCoords: self.__grid[x,y] = a.idnum
 
     def cluster_idnum(self, idnum:int, lstOfCoords:Iterable):
         """ set agent in multiple positions """
         if idnum in self.__pop:
+            self.__fit(idnum)
             for x,y in lstOfCoords: self.__grid[x,y] = idnum
 
     def focus(self, *coord) -> str:
@@ -347,7 +607,107 @@ class World:
         for a,p in zip(_who, _places):
             self.locate_agent(self.__strategies[a], *p)
     #======================== eval part ==========================#
-    def oneStep(self, stepByStep:bool=False) -> bool:
+    def __build_table(self) -> np.ndarray:
+        """ table[p, k]: the position of the k-th neighbor of the cell
+            at position p, area when it is out of the world
+            the boundary functions are called once per line (column)
+            and per neighbor, any of the 16 constraints is allowed
+        """
+        _axes = []
+        for fun,sz,d in ((self.__lig_fun, self.__nbl, 0),
+                         (self.__col_fun, self.__nbc, 1)):
+            if fun in (mirror, symetric):
+                _bad = [_[d] for _ in self.neighbors if abs(_[d]) > sz/2]
+                if _bad:
+                    raise ValueError(f"{fun.__name__} requires |d| <= {sz/2}"
+                                     f", found {_bad}")
+            _1 = [[fun(sz, x, _[d]) for _ in self.neighbors]
+                  for x in range(sz)]
+            _axes.append(np.array([[-1 if v is None else v for v in _]
+                                   for _ in _1], dtype=np.intp)
+                         .reshape(sz, self.__sz_vicinity))
+        _lig = _axes[0][:, None, :]
+        _col = _axes[1][None, :, :]
+        _table = np.where((_lig >= 0) & (_col >= 0),
+                          _lig * self.__nbc + _col, self.area)
+        return _table.reshape(self.area, self.__sz_vicinity)
+
+    def __rows(self, ids:np.ndarray) -> tuple:
+        """ ids: the idnum of each cell, -1 if empty
+            return keys, the sorted idnums, and rows, the row of each
+            cell in keys (-1 if empty) plus -1 for the sentinel
+        """
+        _keys = np.array(sorted(self.__pop), dtype=np.int64)
+        _rows = np.searchsorted(_keys, ids)
+        _pad = np.append(_keys, np.iinfo(np.int64).max)
+        _rows = np.where(_pad[_rows] == ids, _rows, -1)
+        return _keys, np.append(_rows, -1) # the sentinel is empty
+
+    def __payoffs(self, keys:np.ndarray, rows:np.ndarray,
+                  table:np.ndarray, cells:np.ndarray) -> np.ndarray:
+        """ the matrix of the scores between rows, for the pairs
+            met by cells (sorted) and their neighbors (table)
+            the evaluations are done in the order of the scan of
+            the grid, as oneStep always did
+        """
+        _1 = np.repeat(rows[cells], table.shape[1])
+        _2 = rows[table[cells]].ravel()
+        _ok = (_1 >= 0) & (_2 >= 0)
+        _codes = _1[_ok] * len(keys) + _2[_ok]
+        _matrix = np.zeros((len(keys), len(keys)))
+        _, _first = np.unique(_codes, return_index=True)
+        for c in _codes[np.sort(_first)]:
+            i,j = divmod(int(c), len(keys))
+            _matrix[i,j] = self.__evaluation(self.__pop[int(keys[i])],
+                                             self.__pop[int(keys[j])])[0]
+        return _matrix
+
+    def __replace(self, ids:np.ndarray, scores:np.ndarray,
+                  table:np.ndarray, cells:np.ndarray) -> tuple:
+        """ the new idnum of each cell: one of the best neighbors
+            (table gives them) when it beats the resident
+            only cells (sorted) are considered
+            ties are broken with random, cell by cell, in the order
+            of the scan of the grid
+            return the new ids and the cells that have been replaced
+        """
+        _change, _cand = candidates(scores, table, cells)
+        return self.__choose(ids, table, _change, _cand)
+
+    def __choose(self, ids:np.ndarray, table:np.ndarray,
+                 change:np.ndarray, cand:np.ndarray) -> tuple:
+        """ change: the cells to replace (sorted)
+            cand: their best neighbors, see candidates
+            return the new ids and change
+        """
+        _ids = ids.copy()
+        _change, _cand = change, cand
+        if len(_change) == 0: return _ids, _change
+        _k = [random.randrange(n) for n in _cand.sum(axis=1).tolist()]
+        # position of the k-th candidate in each line
+        _col = np.argmax(np.cumsum(_cand, axis=1) > np.array(_k)[:,None],
+                         axis=1)
+        _ids[_change] = ids[table[_change, _col]]
+        return _ids, _change
+
+    def __spread(self, cells:np.ndarray) -> np.ndarray:
+        """ cells (sorted) and the cells having one of them as neighbor
+        """
+        if self.__reverse is None: # who has p as neighbor, as in CSR
+            _src = np.repeat(np.arange(self.area), self.__sz_vicinity)
+            _dst = self.__table.ravel()
+            _ok = _dst < self.area
+            _order = np.argsort(_dst[_ok], kind='stable')
+            _ptr = np.bincount(_dst[_ok], minlength=self.area)
+            self.__reverse = (np.concatenate(([0], np.cumsum(_ptr))),
+                              _src[_ok][_order])
+        _ptr, _src = self.__reverse
+        _start, _n = _ptr[cells], _ptr[cells+1] - _ptr[cells]
+        _idx = (np.repeat(_start - np.cumsum(_n) + _n, _n) +
+                np.arange(_n.sum()))
+        return np.union1d(cells, _src[_idx])
+
+    def oneStep(self, stepByStep:bool=False, frontier:bool=False) -> bool:
         """
            foreach cell compute the average score
            foreach cell 
@@ -355,6 +715,12 @@ class World:
               replace the idnum by one of the highest
            :return: True if no change, False otherwise
 
+           frontier: only the cells whose vicinity changed at the
+           previous step are scored again, the result is the same
+           when workers is set (and frontier is False), the grid is
+           processed by bands of lines in workers processes, the
+           result is the same
+
         ex: 7, 5, 2 0 // vicinity = von Neumann, fixe
         g b b
         g g b
@@ -366,55 +732,117 @@ class World:
         if self.model is None:
             print("a Model is required, process halted ...")
             return False
+        if frontier: return self.__frontier_step(stepByStep)
+        return self.__step(self.__table, stepByStep)
+
+    def __step(self, table:np.ndarray, stepByStep:bool) -> bool:
+        """ one generation, table provides the neighbors of each cell """
         # we have a grid[idnum] to scan
         # self.__scores memorize values
-        _scores = np.zeros(shape = (self.nb_lines, self.nb_columns))
-        for i in range(self.nb_lines):
-            for j in range(self.nb_columns):
-                _nb = 0
-                _agent = self.get_agent(i,j)
-                if _agent is None: continue
-                _others = self.vicinity(i,j)
-                for a,b in _others:
-                    _adv = self.get_agent(a,b)
-                    if _adv is None: continue
-                    _scores[i,j] += self.__evaluation(_agent, _adv)[0]
-                    _nb += 1
-                if _nb > 0: _scores[i,j] /= _nb
+        _ids = np.asarray(self.__grid, dtype=np.int64).ravel()
+        _all = np.arange(self.area)
+        _keys, _rows = self.__rows(_ids)
+        _matrix = self.__payoffs(_keys, _rows, table, _all)
+        if table is self.__table and self.__bands is not None:
+            return self.__band_step(_ids, _rows, _matrix, stepByStep)
+        _scores = averages(_rows, _matrix, table, _all)
 
         # knowing _scores we have to dispatch info
 
         if stepByStep:
-            print("\tscores\n{}".format(grid(np.round(_scores,2))))
-            
-        _grid = np.zeros(shape = (self.nb_lines, self.nb_columns),
-                         dtype=int)
-        for i in range(self.nb_lines):
-            for j in range(self.nb_columns):
-                _0 = max([_scores[a,b] for a,b in self.vicinity(i,j)])
-                if _0 <= _scores[i,j]: # old resident stays
-                    _grid[i,j] = self.__grid[i,j]
-                else: # choose one of the best
-                    _grid[i,j] = random.choice([ self.__grid[a,b]
-                                                for a,b in self.vicinity(i,j)
-                                                if _scores[a,b] == _0])
-        _rep = np.all([self.__grid == _grid])
-        self.__grid = _grid # change repartition
+            _1 = _scores.reshape(self.nb_lines, self.nb_columns)
+            print("\tscores\n{}".format(grid(np.round(_1,2))))
+
+        _grid, _ = self.__replace(_ids, _scores, table, _all)
+        return self.__change(_grid.reshape(self.nb_lines, self.nb_columns))
+
+    def __band_step(self, ids:np.ndarray, rows:np.ndarray,
+                    matrix:np.ndarray, stepByStep:bool) -> bool:
+        """ the end of __step, scores and candidates by bands """
+        if self.__bands.nkeys != len(matrix): # the pop has changed
+            self.workers = self.workers
+        _scores, _change, _cand = self.__bands.step(rows, matrix)
+
+        if stepByStep:
+            _1 = _scores.reshape(self.nb_lines, self.nb_columns)
+            print("\tscores\n{}".format(grid(np.round(_1,2))))
+
+        _grid, _ = self.__choose(ids, self.__table, _change, _cand)
+        return self.__change(_grid.reshape(self.nb_lines, self.nb_columns))
+
+    def __frontier_step(self, stepByStep:bool) -> bool:
+        """ same as __step with the structured vicinity
+            self.__frontier keeps from the previous step the scores,
+            the cells that were replaced (their choice is random) and
+            the cells that changed ; only the cells whose vicinity
+            has changed are scored, only the cells whose vicinity
+            scores have changed are decided again
+        """
+        _ids = np.asarray(self.__grid, dtype=np.int64).ravel()
+        _keys, _rows = self.__rows(_ids)
+        if self.__frontier is None: # everything is new
+            _scores = np.zeros(self.area)
+            _cells = _decide = np.arange(self.area)
+        else:
+            _scores, _replaced, _dirty = self.__frontier
+            _cells = self.__spread(_dirty)
+            _decide = np.union1d(self.__spread(_cells), _replaced)
+        _matrix = self.__payoffs(_keys, _rows, self.__table, _cells)
+        _scores[_cells] = averages(_rows, _matrix, self.__table,
+                                          _cells)
+
+        if stepByStep:
+            _1 = _scores.reshape(self.nb_lines, self.nb_columns)
+            print("\tscores\n{}".format(grid(np.round(_1,2))))
+
+        _grid, _replaced = self.__replace(_ids, _scores, self.__table,
+                                          _decide)
+        _dirty = np.nonzero(_grid != _ids)[0]
+        _rep = self.__change(_grid.reshape(self.nb_lines, self.nb_columns))
+        self.__frontier = (_scores, _replaced, _dirty)
         return _rep
 
+    def __change(self, new:np.ndarray) -> bool:
+        """ set the new repartition, update the census
+            :return: True if no change, False otherwise
+        """
+        _new = new.astype(self.__grid.dtype)
+        _diff = self.__grid != _new
+        self.__changed = int(np.count_nonzero(_diff))
+        if self.__census is not None and _diff.any():
+            _n = len(self.__census)
+            _old = self.__grid[_diff].astype(np.intp)+1
+            self.__census += (np.bincount(_new[_diff].astype(np.intp)+1,
+                                          minlength=_n) -
+                              np.bincount(_old, minlength=_n))
+        self.__grid = _new # change repartition
+        self.__frontier = None # see __frontier_step
+        return not _diff.any()
+
     def __p2c(self, pos:int) -> tuple:
         """ given 1D loc provides 2D loc """
         return pos//self.nb_columns, pos%self.nb_columns
     def __c2p(self, *coord) -> int:
         """ given 2D loc provides 1D loc """
         return coord[0]*self.nb_columns+coord[1]
-    def __rand_vicinity(self, *coord) -> tuple:
-        """ given 2D loc provides some random ennemies """
-        p = self.__c2p(coord[0], coord[1])
-        _l = set(range(self.area))
-        _l.discard(p)
-        return tuple([self.__p2c(x)
-                for x in random.sample(list(_l), k=self.__sz_vicinity)])
+    def __rand_table(self) -> np.ndarray:
+        """ for each cell some random ennemies, all different and
+            not the cell itself: the k-th is drawn among area-1-k
+            positions, then shifted past the cell and the previous ones
+        """
+        if self.__sz_vicinity > self.area-1:
+            raise ValueError("the vicinity is larger than the world")
+        _rng = self.generator
+        if _rng is None: _rng = np.random.default_rng(random.getrandbits(64))
+        _taken = np.arange(self.area, dtype=np.intp)[:, None]
+        _table = np.empty((self.area, self.__sz_vicinity), dtype=np.intp)
+        for k in range(self.__sz_vicinity):
+            _r = _rng.integers(0, self.area-1-k, size=self.area)
+            for j in range(_taken.shape[1]): # _taken is sorted
+                _r += _r >= _taken[:,j]
+            _table[:,k] = _r
+            _taken = np.sort(np.column_stack((_taken, _r)), axis=1)
+        return _table
     
     def oneRandStep(self, stepByStep:bool=False) -> bool:
         """
@@ -423,58 +851,67 @@ class World:
               find the highest val in neighborhood
               replace the idnum by one of the highest
            :return: True if no change, False otherwise
+
+           the neighborhood of each cell is drawn at random, for the
+           whole grid at once (see generator)
         """
 
         if self.model is None:
             print("a Model is required, process halted ...")
             return False
-        # we have a grid[idnum] to scan
-        # self.__scores memorize values
-        _scores = np.zeros(shape = (self.nb_lines, self.nb_columns))
-        _vicinity = [None for i in range(self.area)]
-        for i in range(self.nb_lines):
-            for j in range(self.nb_columns):
-                _nb = 0
-                _agent = self.get_agent(i,j)
-                _others = self.__rand_vicinity(i,j)
-                _vicinity[self.__c2p(i,j)] = _others
-                if _agent is None: continue # pas de match
-                for a,b in _others:
-                    _adv = self.get_agent(a,b)
-                    if _adv is None: continue
-                    _scores[i,j] += self.__evaluation(_agent, _adv)[0]
-                    _nb += 1
-                if _nb > 0: _scores[i,j] /= _nb
+        return self.__step(self.__rand_table(), stepByStep)
 
-        # knowing _scores we have to dispatch info
+    @property
+    def census_order(self) -> list:
+        """ 'vide' then the sorted idnums: the columns of the history """
+        return ['vide']+sorted(self.__pop.keys())
+    def __census_index(self, order:list) -> np.ndarray:
+        """ the index in the census of each item of order """
+        return np.array([0]+[x+1 for x in order[1:]], dtype=np.intp)
 
-        if stepByStep:
-            print("\tscores\n{}".format(grid(np.round(_scores,2))))
-            
-        _grid = np.zeros(shape = (self.nb_lines, self.nb_columns),
-                         dtype=int)
-        for i in range(self.nb_lines):
-            for j in range(self.nb_columns):
-                _voisins = _vicinity[self.__c2p(i,j)]
-                if _voisins is None: continue
-                _0 = max([_scores[a,b] for a,b in _voisins])
-                if _0 <= _scores[i,j]: # old resident stays
-                    _grid[i,j] = self.__grid[i,j]
-                else: # choose one of the best
-                    _grid[i,j] = random.choice([ self.__grid[a,b]
-                                for a,b in _vicinity[self.__c2p(i,j)]
-                                                if _scores[a,b] == _0])
-        _rep = np.all([self.__grid == _grid])
-        self.__grid = _grid # change repartition
-        return _rep
+    def run(self, atMost:int=100, kind:bool=True, frontier:bool=False,
+            withGrid:bool=False, resume:bool=False) -> Iterable:
+        """ headless loop, nothing is printed nor asked
+            yield a snapshot (dict) for the start and after each
+            generation, until atMost generations or stability
+              generation: the number of generations done
+              census: the pop of each item of census_order
+              changed: the number of cells changed by the generation
+              stable: True if nothing changed
+              grid: a copy of the grid (only when withGrid is True)
+            kind, frontier, resume: see loop
+        """
+        if self.model is None: raise ValueError("a Model is required")
+        _iter, _stability = self.__start(resume)
+        _one = self.oneStep if kind else self.oneRandStep
+        if kind and frontier: _one = lambda x: self.oneStep(x, True)
+        _index = self.__census_index(self.census_order)
+        def snapshot(i:int, changed:int, stable:bool) -> dict:
+            """ what is yielded """
+            _1 = {'generation': i, 'census': self.__get_census()[_index],
+                  'changed': changed, 'stable': stable}
+            if withGrid: _1['grid'] = self.__grid.copy()
+            return _1
+        yield snapshot(_iter, 0, _stability)
+        while _iter < atMost and not _stability:
+            _stability = _one(False)
+            _iter += 1
+            self.__generation, self.__stable = _iter, _stability
+            yield snapshot(_iter, self.__changed, _stability)
 
     def loop(self, atMost:int=100, kind:bool=True,
-             stepByStep:bool=True, withPlot:bool=False) -> (list, np.array):
+             stepByStep:bool=True, withPlot:bool=False,
+             frontier:bool=False, resume:bool=False) -> (list, np.array):
         """ 
            atMost: number max of iteration
            kind: True 'oneStep', False 'oneRandStep'
            stepByStep: True stop at each generation and display world data
            withPlot: True plot the evolution
+           frontier: True only the cells near a change are evaluated
+                     (structured vicinity only, same results)
+           resume: True goes on from the generation of the last loop
+                   or of the checkpoint, atMost includes the
+                   generations already done ; _h starts there
 
            algorithm:
            k = 0 ; stable = False
@@ -487,26 +924,28 @@ class World:
             until k == atMost or stable
             return (order, tuple(array))
         """
-        random.seed(self.random_state)
+        _iter, _stability = self.__start(resume)
+        _first = _iter
         _one = self.oneStep if kind else self.oneRandStep
-        _iter = 0 ; _stability = False
-        _order = ['vide']
-        _order.extend(sorted(self.__pop.keys()))
-        _evol = []
-        _current = self.population
-        _evol.append([_current.get(x, 0) for x in _order])
+        if kind and frontier: _one = lambda x: self.oneStep(x, True)
+        _order = self.census_order
+        # census index of each column of _evol
+        _index = self.__census_index(_order)
+        _evol = np.zeros(shape=(max(0, atMost-_first)+1, len(_order)),
+                         dtype=int)
+        _evol[0] = self.__get_census()[_index]
         while _iter < atMost and not _stability:
             _msg = "start" if _iter == 0 else "iter {:03d}".format(_iter)
             if stepByStep: print("{}\n{}".format(_msg, self))
             _stability = _one(stepByStep)
-            _current = self.population
             if stepByStep:
-                print("repartition", _current) 
-            _evol.append([_current.get(x, 0) for x in _order])
+                print("repartition", self.population)
+            _evol[_iter+1-_first] = self.__get_census()[_index]
             if stepByStep and not _stability: input("<next step>")
             _iter += 1
+            self.__generation, self.__stable = _iter, _stability
 
-        _h = np.array(_evol[:], dtype=int)
+        _h = _evol[:_iter+1-_first]
 
         # and now the graph of evolution
         # if HASPLOT is True and withPlot is 'on'
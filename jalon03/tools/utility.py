@@ -77,16 +77,125 @@ def backward_search(ze_memory:str) -> tuple:
     if len(_idx) == 1: return (_idx, _szp)
     return _old, _szp-1 # faster than if _idx![]: _szp += 1
 
+class SuffixIndex:
+    """ Helper for 'Motif'
+        online suffix automaton of a growing memory of rewards
+        search() gives the same answer as backward_search(memory)
+
+        each state is a set of suffixes with the same end positions
+        link: the state of the longest suffix with more end positions
+        the end positions of a state are the first positions of the
+        non cloned states below it, following link backward
+    """
+    def __init__(self, ze_memory:str=''):
+        self.__text = []
+        self.__len = [0]
+        self.__link = [-1]
+        self.__next = [{}]
+        self.__first = [-1]
+        self.__clone = [False]
+        self.__below = [set()]
+        self.__last = 0
+        for x in ze_memory: self.append(x)
+
+    def __new_state(self, size:int, first:int, clone:bool) -> int:
+        """ add a state, return its number """
+        self.__len.append(size)
+        self.__link.append(-1)
+        self.__next.append({})
+        self.__first.append(first)
+        self.__clone.append(clone)
+        self.__below.append(set())
+        return len(self.__len)-1
+
+    def __set_link(self, u:int, v:int):
+        """ link u to v, keep the reverse links up to date """
+        if self.__link[u] >= 0: self.__below[self.__link[u]].discard(u)
+        self.__link[u] = v
+        self.__below[v].add(u)
+
+    def append(self, rew:str):
+        """ add one reward at the end of the memory, amortized O(1) """
+        for c in rew:
+            _pos = len(self.__text)
+            self.__text.append(c)
+            _cur = self.__new_state(self.__len[self.__last]+1, _pos, False)
+            p = self.__last
+            while p >= 0 and c not in self.__next[p]:
+                self.__next[p][c] = _cur
+                p = self.__link[p]
+            if p < 0: self.__set_link(_cur, 0)
+            else:
+                q = self.__next[p][c]
+                if self.__len[p]+1 == self.__len[q]: self.__set_link(_cur, q)
+                else:
+                    _cl = self.__new_state(self.__len[p]+1, self.__first[q],
+                                           True)
+                    self.__next[_cl] = dict(self.__next[q])
+                    self.__set_link(_cl, self.__link[q])
+                    while p >= 0 and self.__next[p].get(c) == q:
+                        self.__next[p][c] = _cl
+                        p = self.__link[p]
+                    self.__set_link(q, _cl)
+                    self.__set_link(_cur, _cl)
+            self.__last = _cur
+
+    def end_positions(self, u:int) -> list:
+        """ the sorted end positions of the state u """
+        _todo = [u] ; _rep = []
+        while _todo:
+            v = _todo.pop()
+            if not self.__clone[v]: _rep.append(self.__first[v])
+            _todo.extend(self.__below[v])
+        return sorted(_rep)
+
+    def search(self) -> tuple:
+        """ same as backward_search on the memory
+            the longest suffix found earlier is the state link(last)
+            if it ends only once before, the size is one more than
+            the next suffix with more end positions
+        """
+        _n = len(self.__text)
+        if _n < 2: return [], 0
+        u = self.__link[self.__last]
+        if self.__len[u] == 0: return [], 0
+        _idx = [x for x in self.end_positions(u) if x != _n-1]
+        if len(_idx) > 1: return _idx, self.__len[u]
+        return _idx, self.__len[self.__link[u]]+1
+
+    def __getstate__(self) -> dict:
+        """ the sets are sorted: equal indexes, equal pickles """
+        _1 = dict(vars(self))
+        _1['_SuffixIndex__below'] = [sorted(x) for x in self.__below]
+        return _1
+
+    def __setstate__(self, state:dict):
+        vars(self).update(state)
+        self.__below = [set(x) for x in self.__below]
+
+    def __len__(self) -> int:
+        return len(self.__text)
+
+    def __getitem__(self, key) -> str:
+        """ rewards by index or slice """
+        return ''.join(self.__text[key])
+
+    def __str__(self) -> str:
+        return ''.join(self.__text)
+
+# T and S are exchanged, the other rewards are the same for both
+ADV_REWARDS = str.maketrans('TS', 'ST')
+
 def adv_memory(ze_memory:str) -> str:
     """
     given our memory, provides the supposed memory of adv
     ensures len(adv_memory) == len(ze_memory)
     """
-    return ''.join([{'T': 'S', 'S':'T'}.get(x, x)
-                    for x in ze_memory])
+    return ze_memory.translate(ADV_REWARDS)
 
 if __name__ == '__main__':
-    for meth in (probability_vector, update_storage, backward_search):
+    for meth in (probability_vector, update_storage, backward_search,
+                 SuffixIndex):
         print(f"{'='*7} {meth.__name__} {'='*7}")
         print(meth.__doc__)
         print(f"{'-'*77}")
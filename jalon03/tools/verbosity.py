@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "mmc <marc-michel dot corsini at u-bordeaux dot fr>"
+__date__ = "18.10.26"
+__usage__ = """
+
+    The verbosity of the engines and of the learners
+    nothing is printed, unless some callback is registered
+    a callback is f(topic:str, message:str)
+
+    topics are
+      'round'      evaluation, the state of the strategies after each round
+      'evaluation' evaluation and learning, noises of the matches
+      'tournament' tournament, the scores and the number of encounters
+      'learning'   adaptive_evaluation, default behaviors and good guesses
+      'learner'    Mime, Shannon, the updates of the knowledge
+      'ecology'    eco_evol, the pairings and the generations
+      'world'      World, the grid
+
+    * register(callback, topics=None) -> callback
+    topics None means every topic
+
+    * unregister(callback)
+
+    * tracing(callback, topics=None)
+    a context manager, the callback is registered for one run
+    >>> with tracing(printer, ('evaluation',)): evaluation(a, b)
+
+    * muted()
+    a context manager, no callback is called during the run
+
+    * tracer(topic) -> f(message) or None
+    the engines ask once per call, None means nothing to report,
+    so the silent runs have no logging in their loops
+
+    * printer(topic, message)
+    a callback printing the message, as the former DEBUG mode did
+"""
+
+#--------------- import -----------------#
+from contextlib import contextmanager
+#========================================#
+
+TOPICS = ('round', 'evaluation', 'tournament', 'learning',
+          'learner', 'ecology', 'world')
+
+_CALLBACKS = [] # (callback, topics)
+_ACTIVE = {} # topic -> f(message), only the topics with a callback
+_MUTED = [0]
+
+def _update():
+    """ build the dispatcher of each topic """
+    _ACTIVE.clear()
+    if _MUTED[0] > 0: return
+    for topic in TOPICS:
+        _1 = tuple(f for f,t in _CALLBACKS if t is None or topic in t)
+        if _1 == (): continue
+        def _dispatch(message:str, topic=topic, _1=_1):
+            for f in _1: f(topic, message)
+        _ACTIVE[topic] = _dispatch
+
+def register(callback, topics:tuple=None):
+    """ callback(topic, message) is called for each message of topics """
+    if topics is not None:
+        topics = tuple(topics)
+        _bad = [x for x in topics if x not in TOPICS]
+        if _bad: raise ValueError("unknown topic(s) {}".format(_bad))
+    _CALLBACKS.append((callback, topics))
+    _update()
+    return callback
+
+def unregister(callback):
+    """ remove the last registration of callback """
+    for i in range(len(_CALLBACKS)-1, -1, -1):
+        if _CALLBACKS[i][0] is callback:
+            del _CALLBACKS[i]
+            break
+    _update()
+
+@contextmanager
+def tracing(callback, topics:tuple=None):
+    """ callback is registered for the duration of the block """
+    register(callback, topics)
+    try:
+        yield callback
+    finally:
+        unregister(callback)
+
+@contextmanager
+def muted():
+    """ no callback is called during the block """
+    _MUTED[0] += 1
+    _update()
+    try:
+        yield
+    finally:
+        _MUTED[0] -= 1
+        _update()
+
+def tracer(topic:str):
+    """ f(message) reporting to the callbacks of topic, None if none """
+    return _ACTIVE.get(topic, None)
+
+def printer(topic:str, message:str):
+    """ the default callback """
+    print(message)
+
+if __name__ == "__main__":
+    print(__usage__)
+    from ezCLI import testcode
+    code = """
+tracer('round') is None
+_1 = []
+with tracing(lambda t,m: _1.append((t,m)), ('round',)): tracer('round')('hello')
+_1
+tracer('round') is None
+_ = register(printer)
+with muted(): _2 = tracer('world')
+_2 is None
+tracer('world')('visible')
+unregister(printer)
+tracer('world') is None
+""" ; testcode(code)